@@ -1,16 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Header, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, validator
+import asyncio
+import json
 
-from services.batch_service import BatchGenerationService
+from services.batch_service import BatchGenerationService, FINISHED_BATCH_STATUSES, GENERATION_CHUNK_POSTS
+from services.usage_service import UsageService, QuotaExceeded
+from services.campaign_stats_service import CampaignStatsService
+from services.prompt_templates import tone_registry
+from services.provider_router import generation_router
+from services.scheduler import effective_priority, post_backlog
+from services.batch_planner import plan_batch
+from services.batch_import import ImportFormatError, detect_format, import_posts
+from services.batch_control import batch_control
+from services.idempotency_service import IdempotencyService, IdempotencyConflict, MAX_KEY_LENGTH, fingerprint
 from models.batch_job import BatchJob
-from database import get_db
+from models.campaign_post import CampaignPost
+from database import get_db, SessionLocal
 import auth
 
 router = APIRouter()
 
+# Events buffered per streaming client before tokens start being coalesced
+STREAM_BUFFER_EVENTS = 32
+
+# Keep references to running stream producers so they aren't garbage collected
+_stream_tasks = set()
+
+# generate-batch runs in this process by batch id, so a retried request can wait on them
+_batch_runs: Dict[str, asyncio.Task] = {}
+
+# Retry-After sent when work is shed because the queue is full
+SHED_RETRY_AFTER_SECONDS = 30
+
+def shed_load(post_count: int):
+    """Refuse work we can't do right now with 503 + Retry-After"""
+    if batch_control.draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down, try again shortly",
+            headers={"Retry-After": str(SHED_RETRY_AFTER_SECONDS)}
+        )
+    if not generation_router.is_available("caption"):
+        retry_after = max(1, int(generation_router.retry_after("caption")))
+        raise HTTPException(
+            status_code=503,
+            detail="Content generation is temporarily unavailable",
+            headers={"Retry-After": str(retry_after)}
+        )
+    if post_backlog.saturated(post_count):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Generation queue is full ({post_backlog.posts} posts pending), try again later",
+            headers={"Retry-After": str(SHED_RETRY_AFTER_SECONDS)}
+        )
+
 # Pydantic models for request/response
 class PostRequest(BaseModel):
     brand_name: str
@@ -19,9 +68,31 @@ class PostRequest(BaseModel):
     brief: str = ""
     target_audience: str = "General audience"
 
+    @validator('tone')
+    def normalize_tone(cls, value):
+        # Known tones are checked by the endpoint, which can refresh the registry with its session
+        return value.strip().lower()
+
+def check_tones(db: Session, posts: List[PostRequest]):
+    """Reject unknown tones with a 422, refreshing the tone registry through the request's session"""
+    tone_registry.ensure_loaded(db)
+    unknown = sorted({post.tone for post in posts if not tone_registry.is_known(post.tone)})
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown tone(s): {', '.join(unknown)}")
+
 class BatchRequest(BaseModel):
     name: str = None
     posts: List[PostRequest]
+    # Scheduling class; only small batches run as interactive (see effective_priority)
+    priority: Optional[Literal["interactive", "normal", "bulk"]] = None
+    # Caption posts sharing brand/tone several per request (JSON output)
+    pack_captions: bool = False
+
+class BatchPlanRequest(BaseModel):
+    # Posts are checked column-wise by the planner rather than one PostRequest
+    # at a time, so invalid rows are reported instead of rejecting the request
+    posts: List[Dict[str, Any]]
+    pack_captions: bool = False
 
 class BatchJobResponse(BaseModel):
     id: str
@@ -30,7 +101,9 @@ class BatchJobResponse(BaseModel):
     status: str
     total_posts: int
     completed_posts: int
+    captions_ready: Optional[int] = None
     failed_posts: int
+    cancelled_posts: Optional[int] = None
     created_by: str
     created_at: datetime
     updated_at: datetime
@@ -43,8 +116,39 @@ async def start_batch_generation(
     campaign_id: str,
     batch_request: BatchRequest,
     db: Session = Depends(get_db),
-    username: str = Depends(auth.get_current_user)  # Add authentication
+    username: str = Depends(auth.get_current_user),  # Add authentication
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    """
+    Generate a batch of posts and return the results.
+
+    With an Idempotency-Key header, retrying the same request returns the
+    batch the first attempt started instead of generating (and paying for)
+    it again: the full result once it has finished, 202 with its progress
+    while it's still running elsewhere.
+    """
+    check_tones(db, batch_request.posts)
+    idempotency = IdempotencyService(db)
+    request_fingerprint = None
+    if idempotency_key is not None:
+        if not idempotency_key.strip() or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        request_fingerprint = fingerprint(campaign_id, batch_request.dict())
+        try:
+            record = idempotency.lookup(username, idempotency_key, request_fingerprint)
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if record is not None:
+            return await _replay_batch(db, record.batch_job_id, username)
+
+    shed_load(len(batch_request.posts))
+    
+    # Admission control - refuse batches that would exceed the user's budget
+    try:
+        UsageService(db).check_budget(username, len(batch_request.posts))
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
     try:
         # Create batch job record
         batch_job = BatchJob(
@@ -55,37 +159,347 @@ async def start_batch_generation(
             created_by=username  # Track who created this batch
         )
         db.add(batch_job)
+        db.flush()
+        
+        # The key is stored in the same transaction as the batch, so a
+        # concurrent retry either sees both or loses the insert race
+        if idempotency_key is not None and not idempotency.claim(
+                username, idempotency_key, request_fingerprint, str(batch_job.id)):
+            db.rollback()
+            try:
+                record = idempotency.lookup(username, idempotency_key, request_fingerprint)
+            except IdempotencyConflict as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            if record is None:
+                raise HTTPException(status_code=409, detail="Idempotency-Key is in use, retry the request")
+            return await _replay_batch(db, record.batch_job_id, username)
+        
         db.commit()
         db.refresh(batch_job)
         
-        # Start background processing
-        batch_service = BatchGenerationService(db)
-        
         # Convert posts to dict format
         posts_data = [post.dict() for post in batch_request.posts]
         
+        priority = effective_priority(batch_request.priority, len(posts_data))
+        
         # For simplicity, we'll process synchronously
         # In production, use Celery or similar for background processing
-        result = await batch_service.process_batch(
-            str(batch_job.id), 
-            posts_data
-        )
+        result = await _run_batch(str(batch_job.id), posts_data, priority, batch_request.pack_captions)
+        db.refresh(batch_job)
         
         return {
-            'batch_job': {
-                'id': str(batch_job.id),
-                'status': batch_job.status,
-                'total_posts': batch_job.total_posts,
-                'completed_posts': batch_job.completed_posts,
-                'failed_posts': batch_job.failed_posts,
-                'created_by': username
-            },
+            'batch_job': _batch_job_summary(batch_job, username),
             'result': result
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _run_batch(batch_job_id: str, posts_data: List[Dict], priority: str, pack_captions: bool) -> Dict:
+    """Run a batch to completion as a task that outlives a disconnected client"""
+    return await _run_shielded(batch_job_id, lambda session: BatchGenerationService(session).process_batch(
+        batch_job_id, posts_data, priority=priority, pack_captions=pack_captions
+    ))
+
+async def _run_shielded(batch_job_id: str, work: Callable[[Session], Awaitable[Dict]]) -> Dict:
+    """Run work on its own session as a task a disconnected client can't cancel"""
+    async def run():
+        # Own session: the request-scoped one is closed if the client goes away
+        session = SessionLocal()
+        try:
+            return await work(session)
+        finally:
+            session.close()
+
+    task = asyncio.ensure_future(run())
+    _batch_runs[batch_job_id] = task
+    task.add_done_callback(lambda _: _batch_runs.pop(batch_job_id, None))
+    return await asyncio.shield(task)
+
+async def _replay_batch(db: Session, batch_job_id: str, username: str):
+    """Response for a retried request whose Idempotency-Key already has a batch"""
+    headers = {"Idempotent-Replayed": "true"}
+    task = _batch_runs.get(batch_job_id)
+    result = None
+    error = None
+    if task is not None and task.get_loop() is asyncio.get_running_loop():
+        try:
+            result = await asyncio.shield(task)
+        except Exception as e:
+            error = str(e)
+
+    batch_job = db.query(BatchJob).filter(BatchJob.id == batch_job_id).first()
+    if not batch_job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    db.refresh(batch_job)
+
+    if result is None and batch_job.status in FINISHED_BATCH_STATUSES:
+        result = BatchGenerationService(db).batch_result(batch_job)
+    if result is None and error is not None:
+        # The run died before finishing the batch - same answer the first request got
+        raise HTTPException(status_code=500, detail=error, headers=headers)
+    if result is None:
+        # Still running on another worker - point the client at the status endpoint
+        return JSONResponse(
+            status_code=202,
+            headers=headers,
+            content={
+                'batch_job': _batch_job_summary(batch_job, username),
+                'status_url': f"/api/batch-jobs/{batch_job_id}/status"
+            }
+        )
+    return JSONResponse(
+        headers=headers,
+        content=jsonable_encoder({'batch_job': _batch_job_summary(batch_job, username), 'result': result})
+    )
+
+def _batch_job_summary(batch_job: BatchJob, username: str) -> Dict:
+    return {
+        'id': str(batch_job.id),
+        'status': batch_job.status,
+        'total_posts': batch_job.total_posts,
+        'completed_posts': batch_job.completed_posts,
+        'failed_posts': batch_job.failed_posts,
+        'created_by': username
+    }
+
+@router.post("/campaigns/{campaign_id}/generate-batch/import", status_code=202)
+async def import_batch(
+    campaign_id: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = None,
+    name: Optional[str] = None,
+    priority: Literal["interactive", "normal", "bulk"] = "bulk",
+    pack_captions: bool = False,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Create a batch from an uploaded CSV or JSONL file and generate it in the background.
+
+    Rows are parsed and validated one at a time and bulk-loaded in chunks,
+    so memory use doesn't grow with the file. Invalid rows are skipped and
+    reported; poll /batch-jobs/{id}/status for progress.
+    """
+    shed_load(0)
+    try:
+        fmt = detect_format(file.filename, format)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batch_job = BatchJob(
+        campaign_id=campaign_id,
+        name=name or f'Import {datetime.now().strftime("%Y%m%d_%H%M%S")}',
+        total_posts=0,
+        status='pending',
+        created_by=username
+    )
+    db.add(batch_job)
+    db.flush()
+
+    tone_registry.ensure_loaded(db)
+
+    def validate(row: Dict) -> Dict:
+        try:
+            post = PostRequest(**row)
+        except ValidationError as e:
+            raise ValueError("; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+        if not tone_registry.is_known(post.tone):
+            raise ValueError(f"tone: Unknown tone '{post.tone}'")
+        return post.dict()
+
+    # Parsing and COPY block - keep them off the event loop. Rows stay in
+    # the open transaction until admission passes below.
+    try:
+        report = await run_in_threadpool(import_posts, db, batch_job, file.file, fmt, validate)
+    except ImportFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    post_count = report['imported_posts']
+    if post_count == 0:
+        db.rollback()
+        raise HTTPException(status_code=400, detail={'message': "No valid rows in upload", **report})
+    try:
+        # Imports are generated a chunk at a time, so only a chunk joins the backlog at once
+        shed_load(min(post_count, GENERATION_CHUNK_POSTS))
+        UsageService(db).check_budget(username, post_count)
+    except QuotaExceeded as e:
+        db.rollback()
+        raise HTTPException(status_code=429, detail=str(e))
+    except HTTPException:
+        db.rollback()
+        raise
+
+    batch_job.total_posts = post_count
+    CampaignStatsService(db).add_posts(campaign_id, post_count)
+    db.commit()
+    batch_job_id = str(batch_job.id)
+
+    background_tasks.add_task(_generate_imported_batch, batch_job_id, effective_priority(priority, post_count),
+                              pack_captions)
+
+    return {
+        'batch_job': {
+            'id': batch_job_id,
+            'status': batch_job.status,
+            'total_posts': post_count,
+            'created_by': username
+        },
+        'import': report
+    }
+
+async def _generate_imported_batch(batch_job_id: str, priority: str, pack_captions: bool):
+    # Own session: the request-scoped one is closed once the response is sent
+    session = SessionLocal()
+    try:
+        job = session.query(BatchJob).filter(BatchJob.id == batch_job_id).first()
+        await BatchGenerationService(session).run_pending(job, priority=priority, pack_captions=pack_captions)
+    except Exception as e:
+        print(f"Import batch {batch_job_id} failed: {str(e)}")
+    finally:
+        session.close()
+
+@router.post("/campaigns/{campaign_id}/generate-batch/plan")
+async def plan_batch_generation(
+    campaign_id: str,
+    plan_request: BatchPlanRequest,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Dry-run a batch: validate posts and estimate tokens, cost and wall time
+    without generating anything
+    """
+    tone_registry.ensure_loaded(db)
+    plan = plan_batch(plan_request.posts, pack_captions=plan_request.pack_captions)
+    
+    try:
+        UsageService(db).check_budget(username, plan['valid_posts'])
+        plan['within_budget'] = True
+    except QuotaExceeded as e:
+        plan['within_budget'] = False
+        plan['budget_error'] = str(e)
+    
+    plan['campaign_id'] = campaign_id
+    return plan
+
+@router.post("/campaigns/{campaign_id}/generate-stream")
+async def stream_post_generation(
+    campaign_id: str,
+    post_request: PostRequest,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Generate a single post and stream it as Server-Sent Events.
+
+    Events: start, token (caption deltas), caption (final text), image,
+    error and done. The post is persisted even if the client disconnects.
+    """
+    check_tones(db, [post_request])
+    shed_load(1)
+    
+    try:
+        UsageService(db).check_budget(username, 1)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    batch_job = BatchJob(
+        campaign_id=campaign_id,
+        name=f'Stream {datetime.now().strftime("%Y%m%d_%H%M%S")}',
+        total_posts=1,
+        status='processing',
+        created_by=username
+    )
+    db.add(batch_job)
+    db.commit()
+    db.refresh(batch_job)
+
+    post = CampaignPost(
+        campaign_id=campaign_id,
+        batch_job_id=batch_job.id,
+        status='pending',
+        **post_request.dict()
+    )
+    db.add(post)
+    CampaignStatsService(db).add_posts(campaign_id, 1)
+    db.commit()
+    batch_job_id, post_id = str(batch_job.id), str(post.id)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_EVENTS)
+    client_gone = asyncio.Event()
+
+    async def emit(event: str, data: Dict):
+        if not client_gone.is_set():
+            await queue.put((event, data))
+
+    async def produce():
+        # Own session: the request-scoped one may be closed before we finish
+        session = SessionLocal()
+        try:
+            service = BatchGenerationService(session)
+            job = session.query(BatchJob).filter(BatchJob.id == batch_job_id).first()
+            row = session.query(CampaignPost).filter(CampaignPost.id == post_id).first()
+
+            # Never block the upstream stream on a slow client: when the
+            # buffer is full, tokens are merged and sent as one larger chunk
+            pending_text = ""
+            async for event, data in service.stream_post(job, row):
+                if event == 'token':
+                    pending_text += data
+                    if not queue.full() and not client_gone.is_set():
+                        queue.put_nowait(('token', {'text': pending_text}))
+                        pending_text = ""
+                    continue
+                if pending_text:
+                    await emit('token', {'text': pending_text})
+                    pending_text = ""
+                key = {'caption': 'caption', 'image': 'image_url', 'error': 'error'}[event]
+                await emit(event, {key: data})
+
+            await emit('done', {'status': row.status})
+        finally:
+            session.close()
+            await emit('end', {})
+
+    task = asyncio.create_task(produce())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    async def event_stream():
+        try:
+            yield _sse('start', {'post_id': post_id, 'batch_job_id': batch_job_id})
+            while True:
+                event, data = await queue.get()
+                if event == 'end':
+                    break
+                yield _sse(event, data)
+        finally:
+            # Client went away (or we're done): unblock the producer and let
+            # it finish persisting without us
+            client_gone.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def in_flight_tasks() -> set:
+    """Generation tasks not tied to a request: stream producers and detached batch runs"""
+    return set(_stream_tasks) | set(_batch_runs.values())
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.get("/campaigns/{campaign_id}/batches", response_model=List[BatchJobResponse])
 async def get_batches_by_campaign(
     campaign_id: str,
@@ -137,9 +551,175 @@ async def get_batch_status(
         'progress': {
             'total_posts': batch_job.total_posts,
             'completed_posts': batch_job.completed_posts,
+            'captions_ready': batch_job.captions_ready or 0,
             'failed_posts': batch_job.failed_posts,
-            'remaining_posts': batch_job.total_posts - batch_job.completed_posts - batch_job.failed_posts,
+            'cancelled_posts': batch_job.cancelled_posts or 0,
+            'remaining_posts': (batch_job.total_posts - batch_job.completed_posts - batch_job.failed_posts
+                                - (batch_job.cancelled_posts or 0)),
             'percentage': round(percentage, 1)
         },
         'created_by': getattr(batch_job, 'created_by', username)
-    }
\ No newline at end of file
+    }
+
+# Batch job status changes allowed by each control action
+CONTROL_TRANSITIONS = {
+    'cancel': ({'pending', 'processing', 'paused'}, 'cancelling'),
+    'pause': ({'pending', 'processing'}, 'paused'),
+    'resume': ({'paused'}, 'processing'),
+}
+
+@router.post("/batch-jobs/{job_id}/cancel")
+async def cancel_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Stop a batch: workers on every node stop claiming posts, in-flight
+    generation calls are cancelled and unfinished posts are marked cancelled
+    """
+    return _control_batch(db, job_id, username, 'cancel')
+
+@router.post("/batch-jobs/{job_id}/pause")
+async def pause_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Hold a batch after its in-flight posts finish; resume picks up where it stopped
+    """
+    return _control_batch(db, job_id, username, 'pause')
+
+@router.post("/batch-jobs/{job_id}/resume")
+async def resume_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    return _control_batch(db, job_id, username, 'resume')
+
+def _control_batch(db: Session, job_id: str, username: str, action: str):
+    batch_job = db.query(BatchJob).filter(
+        BatchJob.id == job_id,
+        BatchJob.created_by == username
+    ).first()
+    if not batch_job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    allowed, new_status = CONTROL_TRANSITIONS[action]
+    if batch_job.status not in allowed:
+        raise HTTPException(status_code=409, detail=f"Can't {action} a batch that is {batch_job.status}")
+    
+    # A batch nobody has started yet has no runner to clean up after it
+    if action == 'cancel' and batch_job.status == 'pending' and not batch_control.is_running(job_id):
+        batch_service = BatchGenerationService(db)
+        batch_job.status = 'cancelled'
+        batch_control.publish(db, job_id, action)
+        batch_service.cancel_unfinished(batch_job, [])
+    else:
+        # The status change and the signal commit together; runners
+        # finish a cancel by marking unfinished posts and the batch cancelled
+        batch_job.status = new_status
+        batch_control.publish(db, job_id, action)
+        db.commit()
+    
+    return {
+        'id': str(batch_job.id),
+        'status': batch_job.status,
+        'cancelled_posts': batch_job.cancelled_posts or 0
+    }
+
+@router.post("/batch-jobs/{job_id}/retry-failed")
+async def retry_failed_posts(
+    job_id: str,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Regenerate only the failed posts of a batch that finished with errors.
+    Posts that failed on the image keep their caption and only get a new
+    image; completed posts are left alone. Idempotency-Key works as for
+    generate-batch: a retried request returns the run the first one started.
+    """
+    idempotency = IdempotencyService(db)
+    request_fingerprint = None
+    if idempotency_key is not None:
+        if not idempotency_key.strip() or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        request_fingerprint = fingerprint('retry-failed', job_id)
+        try:
+            record = idempotency.lookup(username, idempotency_key, request_fingerprint)
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if record is not None:
+            return await _replay_batch(db, record.batch_job_id, username)
+
+    batch_job = db.query(BatchJob).filter(
+        BatchJob.id == job_id,
+        BatchJob.created_by == username
+    ).first()
+    if not batch_job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if batch_job.status != 'completed_with_errors':
+        raise HTTPException(status_code=409, detail=f"Can't retry a batch that is {batch_job.status}")
+    
+    failed_posts = db.query(CampaignPost).options(selectinload(CampaignPost.content)).filter(
+        CampaignPost.batch_job_id == job_id,
+        CampaignPost.status == 'failed'
+    ).all()
+    if not failed_posts:
+        raise HTTPException(status_code=409, detail="Batch has no failed posts")
+    
+    shed_load(len(failed_posts))
+    try:
+        UsageService(db).check_budget(username, len(failed_posts))
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    # Claim the batch so two concurrent retries can't regenerate the same posts
+    claimed = db.query(BatchJob).filter(
+        BatchJob.id == job_id,
+        BatchJob.status == 'completed_with_errors'
+    ).update({BatchJob.status: 'processing'}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Batch is already being retried")
+    if idempotency_key is not None and not idempotency.claim(
+            username, idempotency_key, request_fingerprint, job_id):
+        db.rollback()
+        try:
+            record = idempotency.lookup(username, idempotency_key, request_fingerprint)
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if record is None:
+            raise HTTPException(status_code=409, detail="Idempotency-Key is in use, retry the request")
+        return await _replay_batch(db, record.batch_job_id, username)
+    db.commit()
+    
+    image_only = sum(1 for post in failed_posts if post.generated_caption)
+    
+    async def retry(session: Session) -> Dict:
+        job = session.query(BatchJob).filter(BatchJob.id == job_id).first()
+        posts = session.query(CampaignPost).options(selectinload(CampaignPost.content)).filter(
+            CampaignPost.batch_job_id == job_id,
+            CampaignPost.status == 'failed'
+        ).all()
+        return await BatchGenerationService(session).retry_failed(job, posts)
+    
+    try:
+        result = await _run_shielded(job_id, retry)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    db.refresh(batch_job)
+    
+    return {
+        'batch_job': _batch_job_summary(batch_job, username),
+        'retried_posts': {
+            'total': len(failed_posts),
+            'caption_and_image': len(failed_posts) - image_only,
+            'image_only': image_only
+        },
+        'result': result
+    }
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from uuid import UUID
 
 from models.campaign import Campaign
 from models.user import User
-from models.campaign_post import CampaignPost
+from models.campaign_post import CampaignPost, with_post_fields
+from models.batch_job import BatchJob
+from models.campaign_stats import CampaignStats
+from services.export_service import MEDIA_TYPES, export_posts
+from services.response_cache import bump_campaign_version, conditional_response, latest, response_cache
+from services.campaign_stats_service import CampaignStatsService, stats_summary
 from database import get_db
 import auth
 
@@ -55,12 +62,37 @@ class CampaignPostResponse(BaseModel):
     generated_image_url: Optional[str] = None
     status: str
     error_message: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    image_count: Optional[int] = None
+    cost_usd: Optional[float] = None
+    template_version: Optional[str] = None
+    duplicate_of: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         orm_mode = True
 
+def _from_orm(model, obj):
+    # Same result as response_model would give, for responses we render ourselves
+    return model(**{name: getattr(obj, name) for name in model.__fields__})
+
+# Columns a post listing can be projected to
+POST_FIELDS = tuple(CampaignPostResponse.__fields__)
+
+def _post_fields(fields: Optional[str]) -> tuple:
+    if not fields:
+        return POST_FIELDS
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in POST_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown) or fields}. Choose from: {', '.join(POST_FIELDS)}"
+        )
+    return selected
+
 # Get user_id from username
 async def get_user_id(username: str, db: Session):
     user = db.query(User).filter(User.username == username).first()
@@ -107,6 +139,7 @@ async def create_campaign(
 # Get all campaigns for the current user
 @router.get("/", response_model=List[CampaignResponse])
 async def get_campaigns(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -115,17 +148,30 @@ async def get_campaigns(
     # Get user ID from username
     user_id = await get_user_id(username, db)
     
-    campaigns = db.query(Campaign).filter(
-        Campaign.user_id == user_id,
-        Campaign.status != "deleted"
-    ).offset(skip).limit(limit).all()
+    filters = (Campaign.user_id == user_id, Campaign.status != "deleted")
+    
+    # One aggregate row decides whether anything in the list changed
+    count, newest, versions = db.query(
+        func.count(Campaign.id), func.max(Campaign.updated_at), func.sum(Campaign.version)
+    ).filter(*filters).one()
+    
+    def render():
+        campaigns = db.query(Campaign).filter(*filters).offset(skip).limit(limit).all()
+        return [_from_orm(CampaignResponse, campaign) for campaign in campaigns]
     
-    return campaigns
+    return conditional_response(
+        request,
+        key=(str(user_id), "campaigns", skip, limit),
+        validator=(count, str(newest), versions),
+        last_modified=latest(newest),
+        render=render
+    )
 
 # Get a specific campaign
 @router.get("/{campaign_id}", response_model=CampaignResponse)
 async def get_campaign(
     campaign_id: UUID,
+    request: Request,
     db: Session = Depends(get_db),
     username: str = Depends(auth.get_current_user)
 ):
@@ -143,7 +189,14 @@ async def get_campaign(
             detail="Campaign not found"
         )
     
-    return campaign
+    return conditional_response(
+        request,
+        key=(str(user_id), "campaign", str(campaign_id)),
+        validator=(campaign.version, str(campaign.updated_at)),
+        last_modified=latest(campaign.updated_at),
+        render=lambda: _from_orm(CampaignResponse, campaign),
+        campaign_id=str(campaign_id)
+    )
 
 # Update a campaign
 @router.put("/{campaign_id}", response_model=CampaignResponse)
@@ -174,6 +227,8 @@ async def update_campaign(
         if value is not None:
             setattr(db_campaign, key, value)
     
+    bump_campaign_version(db, campaign_id)
+    response_cache.invalidate_user(str(user_id))
     db.commit()
     db.refresh(db_campaign)
     
@@ -203,6 +258,8 @@ async def delete_campaign(
     
     # Soft delete by changing status
     db_campaign.status = "deleted"
+    bump_campaign_version(db, campaign_id)
+    response_cache.invalidate_user(str(user_id))
     db.commit()
     
     return None
@@ -211,15 +268,28 @@ async def delete_campaign(
 @router.get("/{campaign_id}/posts", response_model=List[CampaignPostResponse])
 async def get_campaign_posts(
     campaign_id: UUID,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    fields: Optional[str] = None,
+    duplicates: bool = False,
     db: Session = Depends(get_db),
     username: str = Depends(auth.get_current_user)
 ):
     """
     Get all posts for a specific campaign
+
+    fields is an optional comma-separated projection, e.g.
+    fields=id,status,generated_caption - only those columns are loaded
+    and returned. Brief and caption come from the content table, which is
+    only joined when one of them is requested.
+
+    duplicates=true lists only posts whose caption was flagged as a
+    near-duplicate of an earlier post (see duplicate_of).
     """
+    selected = _post_fields(fields)
+    
     try:
         # Get user ID from username
         user_id = await get_user_id(username, db)
@@ -242,13 +312,32 @@ async def get_campaign_posts(
         )
         
         # Filter by status if provided
-        if status:
-            query = query.filter(CampaignPost.status == status)
+        if status_filter:
+            query = query.filter(CampaignPost.status == status_filter)
+        if duplicates:
+            query = query.filter(CampaignPost.duplicate_of.isnot(None))
         
-        # Get posts with pagination
-        posts = query.order_by(CampaignPost.created_at.desc()).offset(skip).limit(limit).all()
+        # Every post write bumps the campaign's stats version - a single-row
+        # lookup, so a revalidation never scans the campaign's posts
+        posts_version, posts_updated_at = db.query(CampaignStats.version, CampaignStats.updated_at).filter(
+            CampaignStats.campaign_id == str(campaign_id)
+        ).first() or (0, None)
         
-        return posts
+        def render():
+            # Get posts with pagination - plain column rows go straight to the
+            # encoder, skipping ORM objects and per-row Pydantic validation
+            rows = with_post_fields(query, selected) \
+                .order_by(CampaignPost.created_at.desc()).offset(skip).limit(limit).all()
+            return [dict(zip(selected, row)) for row in rows]
+        
+        return conditional_response(
+            request,
+            key=(str(user_id), "posts", str(campaign_id), skip, limit, status_filter, duplicates, selected),
+            validator=(campaign.version, posts_version),
+            last_modified=latest(campaign.updated_at, posts_updated_at),
+            render=render,
+            campaign_id=str(campaign_id)
+        )
         
     except HTTPException:
         raise
@@ -256,4 +345,74 @@ async def get_campaign_posts(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get campaign posts: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+# Aggregate stats for a campaign dashboard
+@router.get("/{campaign_id}/stats")
+async def get_campaign_stats(
+    campaign_id: UUID,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Posts by status, success rate, average generation latency and cost,
+    read from the campaign_stats rollup rather than counted from posts
+    """
+    user_id = await get_user_id(username, db)
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == user_id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    return stats_summary(CampaignStatsService(db).get(str(campaign_id)))
+
+# Export all posts for a campaign in one streamed response
+@router.get("/{campaign_id}/export")
+async def export_campaign_posts(
+    campaign_id: UUID,
+    format: Literal["csv", "jsonl", "zip"] = "csv",
+    batch_job_id: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Stream every post of a campaign (optionally one batch) as CSV, JSONL,
+    or a ZIP with the images and a posts.jsonl manifest
+    """
+    # Ownership is checked once up front; the export itself reads from its own session
+    user_id = await get_user_id(username, db)
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == user_id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    if batch_job_id:
+        batch_job = db.query(BatchJob).filter(
+            BatchJob.id == batch_job_id,
+            BatchJob.campaign_id == str(campaign_id)
+        ).first()
+        if not batch_job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Batch job not found"
+            )
+    
+    filename = f"campaign-{campaign_id}" + (f"-batch-{batch_job_id}" if batch_job_id else "") + f".{format}"
+    return StreamingResponse(
+        export_posts(format, str(campaign_id), batch_job_id, status_filter),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
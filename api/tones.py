@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import List, Optional
+
+from database import get_db
+from services.prompt_templates import tone_registry, template_version
+import auth
+
+router = APIRouter()
+
+class ToneResponse(BaseModel):
+    id: str
+    name: str
+    description: str
+    prompt_modifier: Optional[str] = None
+
+@router.get("/", response_model=List[ToneResponse])
+async def get_tones(db: Session = Depends(get_db)):
+    """
+    List the content tones accepted by the generation endpoints
+    """
+    tone_registry.ensure_loaded(db)
+    return tone_registry.all()
+
+@router.post("/reload")
+async def reload_tones(
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Reload content tones from the database without restarting the API
+    """
+    tone_registry.reload(db)
+    return {
+        'tones': len(tone_registry.all()),
+        'template_version': template_version()
+    }
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database import get_db
+from services import usage_service
+from services.usage_service import UsageService
+import auth
+
+router = APIRouter()
+
+@router.get("/")
+async def get_usage(
+    period: Optional[str] = None,
+    db: Session = Depends(get_db),
+    username: str = Depends(auth.get_current_user)
+):
+    """
+    Get token/image usage and cost for the current user, per campaign and in total
+    """
+    service = UsageService(db)
+    period = period or usage_service.current_period()
+
+    campaigns = [
+        {
+            'campaign_id': row.campaign_id,
+            'prompt_tokens': row.prompt_tokens,
+            'completion_tokens': row.completion_tokens,
+            'image_count': row.image_count,
+            'cost_usd': round(row.cost_usd, 6)
+        }
+        for row in service.get_campaign_usage(username, period)
+    ]
+
+    return {
+        'period': period,
+        'total': service.get_user_usage(username, period),
+        'campaigns': campaigns,
+        'budget': {
+            'tokens': usage_service.USER_TOKEN_BUDGET or None,
+            'images': usage_service.USER_IMAGE_BUDGET or None,
+            'cost_usd': usage_service.USER_COST_BUDGET_USD or None
+        }
+    }
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+"""
+Move posts of closed campaigns to the cold campaign_posts partition
+
+Run it periodically (e.g. nightly from cron). Campaigns whose status is in
+CLOSED_CAMPAIGN_STATUSES and that haven't changed for ARCHIVE_AFTER_DAYS
+are archived.
+
+Usage: python archive_posts.py [--older-than-days N] [--restore CAMPAIGN_ID]
+"""
+
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import SessionLocal
+from services.archive_service import ArchiveService, ARCHIVE_AFTER_DAYS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--restore", metavar="CAMPAIGN_ID", help="move a campaign's posts back to the hot partition")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = ArchiveService(db)
+        if args.restore:
+            print(f"Restored {service.restore_campaign(args.restore)} posts of campaign {args.restore}")
+        else:
+            service.archive_closed_campaigns(args.older_than_days)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
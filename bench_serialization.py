@@ -0,0 +1,77 @@
+"""
+Benchmark the campaign posts listing serialization paths
+
+Compares the old response_model path (ORM object -> Pydantic model ->
+jsonable_encoder -> json.dumps) with the column-row path used by
+GET /api/campaigns/{id}/posts, with and without a field projection.
+No database or API key needed: rows are built in memory.
+
+Usage: python bench_serialization.py [rows] [repeats]
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+from models.campaign_post import CampaignPost
+from api.campaigns import CampaignPostResponse, POST_FIELDS, _from_orm
+from services import serialization
+
+CAPTION = ("Fresh drops, bold flavours and a community that shows up. " * 60).strip()
+
+def make_posts(count: int):
+    now = datetime.utcnow()
+    batch_job_id, campaign_id = str(uuid.uuid4()), str(uuid.uuid4())
+    return [
+        CampaignPost(
+            id=str(uuid.uuid4()), batch_job_id=batch_job_id, campaign_id=campaign_id,
+            brand_name="Test Brand", topic="Launch", tone="friendly",
+            brief=f"Post {i} about the spring launch", target_audience="General audience",
+            generated_caption=CAPTION, generated_image_url=f"https://images.example.com/{i}.png",
+            status="completed", error_message=None, prompt_tokens=220, completion_tokens=340,
+            image_count=1, cost_usd=0.0405, template_version="caption@v2,image@v2",
+            created_at=now, updated_at=now
+        )
+        for i in range(count)
+    ]
+
+def legacy_path(posts):
+    return json.dumps(jsonable_encoder([_from_orm(CampaignPostResponse, post) for post in posts])).encode()
+
+def row_path(rows, fields):
+    return serialization.dumps([dict(zip(fields, row)) for row in rows])
+
+def timed(label, fn, repeats):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        body = fn()
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{label:<48} {elapsed * 1000:8.2f} ms   {len(body) / 1024:8.1f} KB")
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    posts = make_posts(count)
+
+    # What query.with_entities(...) hands back: one tuple per row
+    full_rows = [tuple(getattr(post, name) for name in POST_FIELDS) for post in posts]
+    projection = ("id", "status", "generated_caption")
+    projected_rows = [tuple(getattr(post, name) for name in projection) for post in posts]
+
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"{count} posts, {repeats} repeats, encoder: {encoder}\n")
+    baseline = timed("response_model (Pydantic + json)", lambda: legacy_path(posts), repeats)
+    full = timed("column rows, all fields", lambda: row_path(full_rows, POST_FIELDS), repeats)
+    projected = timed(f"column rows, fields={','.join(projection)}", lambda: row_path(projected_rows, projection), repeats)
+    print(f"\nSpeedup: {baseline / full:.1f}x all fields, {baseline / projected:.1f}x projected")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measure how long the API takes to import in a fresh interpreter
+
+Each run imports main in a new process, like a server worker starting
+cold, and reports the median against STARTUP_BUDGET_SECONDS. Exits with
+status 1 when over budget, so it can gate CI. No database connection or
+API key needed - nothing connects at import time.
+
+Usage: python bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))
+
+SNIPPET = (
+    "import time; started = time.perf_counter(); import main, sys; "
+    "print(time.perf_counter() - started, 'openai' in sys.modules)"
+)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    env.setdefault("DATABASE_URL", "sqlite://")
+
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", SNIPPET], env=env, check=True, capture_output=True, text=True
+        ).stdout.split()
+        timings.append(float(output[-2]))
+        openai_loaded = output[-1] == "True"
+
+    median = statistics.median(timings)
+    print(f"import main: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s over {runs} runs")
+    print(f"OpenAI SDK imported at startup: {'yes' if openai_loaded else 'no'}")
+    print(f"Budget {BUDGET_SECONDS:.1f}s: {'OK' if median <= BUDGET_SECONDS else 'EXCEEDED'}")
+    sys.exit(0 if median <= BUDGET_SECONDS else 1)
+
+if __name__ == "__main__":
+    main()
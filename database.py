@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
@@ -9,13 +11,55 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connections per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
 Base = declarative_base()
 
+_engine: Optional[Engine] = None
+
+def get_engine() -> Engine:
+    """The process's engine, created on first use.
+
+    Nothing connects at import time, so a preloading server can import the
+    app once and fork workers that each open their own pool.
+    """
+    global _engine
+    if _engine is None:
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+        options = {"pool_pre_ping": True}
+        if not DATABASE_URL.startswith("sqlite"):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+        _engine = create_engine(DATABASE_URL, **options)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def dispose_engine(close: bool = True):
+    """Drop pooled connections: on shutdown, or with close=False in a
+    forked child so it doesn't close sockets its parent still uses"""
+    global _engine
+    if _engine is not None:
+        _engine.dispose(close=close)
+        _engine = None
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+def __getattr__(name: str):
+    # `from database import engine` keeps working for scripts
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
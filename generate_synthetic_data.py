@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Load synthetic campaigns, batch jobs and posts for performance testing
+
+Posts are spread over --campaigns campaigns owned by a dedicated user, in
+batches of --posts-per-batch, with a realistic mix of statuses, usage and
+creation times. On PostgreSQL each chunk is written with one COPY per
+table and committed with synchronous_commit off, which loads millions of
+rows in minutes; other databases get executemany inserts.
+
+Usage: python generate_synthetic_data.py [--posts N] [--campaigns N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.batch_job import BatchJob
+from models.campaign import Campaign
+from models.campaign_post import CampaignPost, HOT_TIER
+from models.campaign_post_content import CampaignPostContent
+from models.user import User
+from services.batch_import import copy_rows
+from services.campaign_stats_service import CampaignStatsService
+from services.usage_service import estimate_cost
+from auth import get_password_hash
+
+LOADTEST_USERNAME = "loadtest"
+
+# (status, weight) of generated posts
+STATUS_MIX = (('completed', 85), ('failed', 5), ('pending', 5), ('caption_ready', 3), ('cancelled', 2))
+
+TONES = ('friendly', 'casual', 'modern', 'professional', 'humorous')
+TOPICS = ('Spring launch', 'Weekend sale', 'Behind the scenes', 'Customer story', 'New feature', 'Team spotlight')
+
+_POST_COLUMNS = (
+    'id', 'storage_tier', 'batch_job_id', 'campaign_id', 'brand_name', 'topic', 'tone', 'target_audience',
+    'generated_image_url', 'status', 'error_message', 'prompt_tokens', 'completion_tokens', 'image_count',
+    'cost_usd', 'template_version', 'created_at', 'updated_at'
+)
+_CONTENT_COLUMNS = ('post_id', 'brief', 'generated_caption')
+
+def create_campaigns(db: Session, count: int, rng: random.Random) -> List[Campaign]:
+    user = db.query(User).filter(User.username == LOADTEST_USERNAME).first()
+    if user is None:
+        user = User(username=LOADTEST_USERNAME, email=f"{LOADTEST_USERNAME}@example.com",
+                    password_hash=get_password_hash(LOADTEST_USERNAME), first_name="load", last_name="test")
+        db.add(user)
+        db.flush()
+    campaigns = [
+        Campaign(user_id=user.id, name=f"Load test campaign {i + 1}", brand_name=f"Brand {rng.randint(1, 500)}",
+                 target_audience="General audience", tone_id=rng.choice(TONES), status="active")
+        for i in range(count)
+    ]
+    db.add_all(campaigns)
+    db.commit()
+    return campaigns
+
+def post_rows(campaign: Campaign, batch_id: str, count: int, created_at: datetime,
+              rng: random.Random) -> Tuple[List[Dict], List[Dict], Dict[str, int]]:
+    statuses = rng.choices([status for status, _ in STATUS_MIX], [weight for _, weight in STATUS_MIX], k=count)
+    posts, contents, counts = [], [], {}
+    for i, status in enumerate(statuses):
+        post_id = str(uuid.uuid4())
+        topic = rng.choice(TOPICS)
+        has_caption = status in ('completed', 'caption_ready') or (status == 'failed' and rng.random() < 0.5)
+        prompt_tokens, completion_tokens = (rng.randint(150, 300), rng.randint(200, 450)) if has_caption else (0, 0)
+        image_count = 1 if status == 'completed' else 0
+        timestamp = created_at + timedelta(seconds=i)
+        posts.append({
+            'id': post_id,
+            'storage_tier': HOT_TIER,
+            'batch_job_id': batch_id,
+            'campaign_id': str(campaign.id),
+            'brand_name': campaign.brand_name,
+            'topic': topic,
+            'tone': campaign.tone_id,
+            'target_audience': campaign.target_audience,
+            'generated_image_url': f"https://images.example.com/{post_id}.png" if image_count else None,
+            'status': status,
+            'error_message': (("image: " if has_caption else "caption: ") + "Synthetic failure") if status == 'failed' else None,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'image_count': image_count,
+            'cost_usd': estimate_cost(prompt_tokens, completion_tokens, image_count),
+            'template_version': "caption@v2,image@v2" if has_caption else None,
+            'created_at': timestamp,
+            'updated_at': timestamp,
+        })
+        contents.append({
+            'post_id': post_id,
+            'brief': f"{topic} post {i + 1} for {campaign.brand_name}",
+            'generated_caption': f"{topic} with {campaign.brand_name}: post {i + 1}, {rng.getrandbits(32):08x}. "
+                                 f"#{topic.replace(' ', '')}" if has_caption else None,
+        })
+        counts[status] = counts.get(status, 0) + 1
+    return posts, contents, counts
+
+def batch_row(campaign: Campaign, batch_id: str, number: int, counts: Dict[str, int], created_at: datetime) -> Dict:
+    unfinished = counts.get('pending', 0) + counts.get('caption_ready', 0)
+    if unfinished:
+        status = 'processing'
+    elif counts.get('failed'):
+        status = 'completed_with_errors'
+    else:
+        status = 'completed'
+    return {
+        'id': batch_id,
+        'campaign_id': str(campaign.id),
+        'name': f"Load test batch {number}",
+        'status': status,
+        'total_posts': sum(counts.values()),
+        'completed_posts': counts.get('completed', 0),
+        'captions_ready': counts.get('completed', 0) + counts.get('caption_ready', 0),
+        'failed_posts': counts.get('failed', 0),
+        'cancelled_posts': counts.get('cancelled', 0),
+        'created_at': created_at,
+        'updated_at': created_at,
+        'error_log': None,
+        'created_by': LOADTEST_USERNAME,
+    }
+
+def write_chunk(db: Session, batches: List[Dict], posts: List[Dict], contents: List[Dict]):
+    """Write and commit one chunk; losing the last chunks in a crash is fine for test data"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SET LOCAL synchronous_commit = off"))
+        copy_rows(db, BatchJob.__tablename__, tuple(batches[0]), batches)
+        copy_rows(db, CampaignPost.__tablename__, _POST_COLUMNS, posts)
+        copy_rows(db, CampaignPostContent.__tablename__, _CONTENT_COLUMNS, contents)
+    else:
+        db.execute(BatchJob.__table__.insert(), batches)
+        db.execute(CampaignPost.__table__.insert(), posts)
+        db.execute(CampaignPostContent.__table__.insert(), contents)
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=100)
+    parser.add_argument("--posts-per-batch", type=int, default=500)
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="posts written per transaction")
+    parser.add_argument("--days", type=int, default=90, help="spread creation times over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        campaigns = create_campaigns(db, args.campaigns, rng)
+        print(f"Created {len(campaigns)} campaigns, loading {args.posts} posts...")
+
+        start = time.perf_counter()
+        oldest = datetime.utcnow() - timedelta(days=args.days)
+        loaded = batch_number = 0
+        batches, posts, contents = [], [], []
+        while loaded + len(posts) < args.posts:
+            batch_number += 1
+            campaign = campaigns[batch_number % len(campaigns)]
+            batch_id = str(uuid.uuid4())
+            created_at = oldest + timedelta(seconds=rng.uniform(0, args.days * 86400))
+            size = min(args.posts_per_batch, args.posts - loaded - len(posts))
+            batch_posts, batch_contents, counts = post_rows(campaign, batch_id, size, created_at, rng)
+            batches.append(batch_row(campaign, batch_id, batch_number, counts, created_at))
+            posts.extend(batch_posts)
+            contents.extend(batch_contents)
+            if len(posts) >= args.chunk_rows:
+                write_chunk(db, batches, posts, contents)
+                loaded += len(posts)
+                batches, posts, contents = [], [], []
+                print(f"   {loaded} posts ({loaded / (time.perf_counter() - start):,.0f} rows/s)")
+        if posts:
+            write_chunk(db, batches, posts, contents)
+            loaded += len(posts)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {loaded} posts in {batch_number} batches in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s)")
+
+        print("Rebuilding campaign stats...")
+        stats = CampaignStatsService(db)
+        for campaign in campaigns:
+            stats.rebuild(str(campaign.id))
+        db.commit()
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Fresh planner statistics, so test queries use the new indexes
+            db.execute(text("ANALYZE batch_jobs, campaign_posts, campaign_post_contents"))
+            db.commit()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for running the API with several worker processes
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) and workers are
+forked from it, so they share the imported code instead of each paying
+the import cost. Database pools and the OpenAI client are created lazily
+inside each worker, never in the master.
+"""
+
+import multiprocessing
+import os
+from uvicorn.workers import UvicornWorker
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+preload_app = True
+
+# On SIGTERM a worker stops accepting connections and waits up to
+# SHUTDOWN_CONNECTION_SECONDS for open requests (cancelling the rest - their
+# batches run as separate tasks), then drains in-flight batches for up to
+# SHUTDOWN_DRAIN_SECONDS. It's only killed once both had their time plus
+# some slack.
+SHUTDOWN_CONNECTION_SECONDS = int(os.getenv("SHUTDOWN_CONNECTION_SECONDS", "30"))
+SHUTDOWN_DRAIN_SECONDS = int(float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "60")))
+graceful_timeout = SHUTDOWN_CONNECTION_SECONDS + SHUTDOWN_DRAIN_SECONDS + 15
+
+class DrainingUvicornWorker(UvicornWorker):
+    # Without a limit uvicorn waits for slow connections indefinitely and the
+    # batch drain would be cut short by graceful_timeout
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": SHUTDOWN_CONNECTION_SECONDS}
+
+worker_class = DrainingUvicornWorker
+
+# Uvicorn workers heartbeat from the event loop, so this only catches a
+# blocked loop - long batch requests don't count against it
+timeout = int(os.getenv("WORKER_TIMEOUT_SECONDS", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Nothing should have connected before the fork, but if it did the
+    # child must not reuse (or close) the master's sockets
+    from database import dispose_engine
+    dispose_engine(close=False)
@@ -1,28 +1,99 @@
+import time
+
+# Measured from here so the startup figure includes importing the app
+_import_started = time.perf_counter()
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.batch import router as batch_router
+from api.batch import router as batch_router, in_flight_tasks
 from api.auth import router as auth_router
 from api.campaigns import router as campaigns_router
+from api.usage import router as usage_router
+from api.tones import router as tones_router
+from database import get_engine, dispose_engine
+from services.batch_control import batch_control
+from services.circuit_breaker import all_breakers
+from services.openai_service import openai_service
+from services.scheduler import post_backlog
+from services.response_cache import response_cache
+
+_import_seconds = time.perf_counter() - _import_started
+
+# Import plus lifespan startup above this is logged as over budget
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))
+
+# How long shutdown waits for open requests, then for in-flight batches
+SHUTDOWN_CONNECTION_SECONDS = int(os.getenv("SHUTDOWN_CONNECTION_SECONDS", "30"))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "60"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Engine and pool are per process - created here, after any fork
+    get_engine()
+    app.state.startup = {
+        'import_seconds': round(_import_seconds, 3),
+        'init_seconds': round(time.perf_counter() - started, 3),
+    }
+    total = _import_seconds + app.state.startup['init_seconds']
+    print(f"Startup took {total:.2f}s (import {_import_seconds:.2f}s, init {app.state.startup['init_seconds']:.2f}s)")
+    if total > STARTUP_BUDGET_SECONDS:
+        print(f"⚠️  Startup exceeded its {STARTUP_BUDGET_SECONDS:.1f}s budget")
+
+    yield
+
+    # The server has stopped accepting requests; let running batches finish
+    print(f"Draining in-flight batches (up to {SHUTDOWN_DRAIN_SECONDS:.0f}s)...")
+    deadline = time.monotonic() + SHUTDOWN_DRAIN_SECONDS
+    unfinished = await batch_control.drain(SHUTDOWN_DRAIN_SECONDS)
+    pending = set()
+    tasks = in_flight_tasks()
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+    if unfinished or pending:
+        print(f"⚠️  Shutting down with {len(unfinished)} batches and {len(pending)} generation tasks unfinished: "
+              f"{', '.join(unfinished)}")
+    await openai_service.close()
+    dispose_engine()
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Social Media Generator API", version="1.0.0", lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://localhost:8000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-app = FastAPI(title="Social Media Generator API", version="1.0.0")
+    # Include routers
+    app.include_router(batch_router, prefix="/api", tags=["batch"])
+    app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
+    app.include_router(campaigns_router, prefix="/api/campaigns", tags=["campaigns"])
+    app.include_router(usage_router, prefix="/api/usage", tags=["usage"])
+    app.include_router(tones_router, prefix="/api/tones", tags=["tones"])
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:8000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    @app.get("/api/health")
+    async def health_check():
+        return {
+            "status": "draining" if batch_control.draining else "healthy",
+            "message": "API is running",
+            "queued_posts": post_backlog.posts,
+            "running_batches": len(batch_control.running()),
+            "circuit_breakers": [breaker.snapshot() for breaker in all_breakers()],
+            "response_cache": response_cache.snapshot(),
+            "startup": getattr(app.state, "startup", None)
+        }
 
-# Include routers
-app.include_router(batch_router, prefix="/api", tags=["batch"])
-app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
-app.include_router(campaigns_router, prefix="/api/campaigns", tags=["campaigns"])
+    return app
 
-@app.get("/api/health")
-async def health_check():
-    return {"status": "healthy", "message": "API is running"}
+# Module-level app for `uvicorn main:app` and the gunicorn config
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_graceful_shutdown=SHUTDOWN_CONNECTION_SECONDS)
@@ -0,0 +1,53 @@
+from logging.config import fileConfig
+from alembic import context
+from database import Base, DATABASE_URL, get_engine
+
+# Every model has to be imported so autogenerate sees its table
+from models.batch_job import BatchJob
+from models.campaign_post import CampaignPost
+from models.campaign_post_content import CampaignPostContent
+from models.campaign import Campaign
+from models.user import User
+from models.content_tone import ContentTone
+from models.usage_rollup import UsageRollup
+from models.campaign_stats import CampaignStats
+from models.idempotency_key import IdempotencyKey
+from models.caption_signature import CaptionSignature
+from models.caption_lsh_bucket import CaptionLshBucket
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """Emit the SQL to stdout (alembic upgrade head --sql) instead of running it"""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with get_engine().connect() as connection:
+        _run(connection)
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # One transaction per migration, so a migration can leave it for
+        # CREATE INDEX CONCURRENTLY and earlier ones stay applied on failure
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
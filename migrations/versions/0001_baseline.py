@@ -0,0 +1,86 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+The schema init_db.py used to build with create_all before migrations
+were introduced. Databases created that way can be adopted with
+`alembic stamp 0001_baseline` and brought up to date with
+`alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('username', sa.String(50), nullable=False, unique=True),
+        sa.Column('email', sa.String(255), nullable=False, unique=True),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('first_name', sa.String(100)),
+        sa.Column('last_name', sa.String(100)),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        'campaigns',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('brand_name', sa.String(255), nullable=False),
+        sa.Column('target_audience', sa.Text()),
+        sa.Column('tone_id', sa.String(20)),
+        sa.Column('status', sa.String(20)),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+    op.create_table(
+        'batch_jobs',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('campaign_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('status', sa.String()),
+        sa.Column('total_posts', sa.Integer()),
+        sa.Column('completed_posts', sa.Integer()),
+        sa.Column('failed_posts', sa.Integer()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('error_log', sa.Text()),
+        sa.Column('created_by', sa.String()),
+    )
+    op.create_table(
+        'campaign_posts',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('batch_job_id', sa.String(), nullable=False),
+        sa.Column('campaign_id', sa.String(), nullable=False),
+        sa.Column('brand_name', sa.String(), nullable=False),
+        sa.Column('topic', sa.String()),
+        sa.Column('tone', sa.String(), nullable=False),
+        sa.Column('brief', sa.Text()),
+        sa.Column('target_audience', sa.String()),
+        sa.Column('generated_caption', sa.Text()),
+        sa.Column('generated_image_url', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('error_message', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_table(
+        'content_tones',
+        sa.Column('id', sa.String(20), primary_key=True),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('prompt_modifier', sa.Text()),
+    )
+
+def downgrade():
+    for table in ('content_tones', 'campaign_posts', 'batch_jobs', 'campaigns', 'users'):
+        op.drop_table(table)
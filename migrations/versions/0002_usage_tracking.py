@@ -0,0 +1,42 @@
+"""Per-post usage and monthly usage rollups
+
+Revision ID: 0002_usage_tracking
+Revises: 0001_baseline
+Create Date: 2026-10-19
+
+Posts generated before usage was tracked count as zero.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_usage_tracking'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+USAGE_COLUMNS = (
+    ('prompt_tokens', sa.Integer(), '0'),
+    ('completion_tokens', sa.Integer(), '0'),
+    ('image_count', sa.Integer(), '0'),
+    ('cost_usd', sa.Float(), '0'),
+)
+
+def upgrade():
+    for name, type_, default in USAGE_COLUMNS:
+        op.add_column('campaign_posts', sa.Column(name, type_, server_default=default))
+    op.create_table(
+        'usage_rollups',
+        sa.Column('username', sa.String(50), primary_key=True),
+        sa.Column('campaign_id', sa.String(), primary_key=True),
+        sa.Column('period', sa.String(7), primary_key=True),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('image_count', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table('usage_rollups')
+    for name, _, _ in reversed(USAGE_COLUMNS):
+        op.drop_column('campaign_posts', name)
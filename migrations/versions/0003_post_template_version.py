@@ -0,0 +1,19 @@
+"""Prompt template version on posts
+
+Revision ID: 0003_post_template_version
+Revises: 0002_usage_tracking
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_post_template_version'
+down_revision = '0002_usage_tracking'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('campaign_posts', sa.Column('template_version', sa.String(64)))
+
+def downgrade():
+    op.drop_column('campaign_posts', 'template_version')
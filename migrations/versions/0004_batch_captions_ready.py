@@ -0,0 +1,23 @@
+"""Caption progress counter on batch jobs
+
+Revision ID: 0004_batch_captions_ready
+Revises: 0003_post_template_version
+Create Date: 2026-10-19
+
+Batches from before the two-stage pipeline wrote caption and image
+together, so their completed posts are the ones with a caption.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_batch_captions_ready'
+down_revision = '0003_post_template_version'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('batch_jobs', sa.Column('captions_ready', sa.Integer(), server_default='0'))
+    op.execute("UPDATE batch_jobs SET captions_ready = completed_posts WHERE completed_posts IS NOT NULL")
+
+def downgrade():
+    op.drop_column('batch_jobs', 'captions_ready')
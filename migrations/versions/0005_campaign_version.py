@@ -0,0 +1,19 @@
+"""Write counter on campaigns for ETags
+
+Revision ID: 0005_campaign_version
+Revises: 0004_batch_captions_ready
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_campaign_version'
+down_revision = '0004_batch_captions_ready'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('campaigns', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+def downgrade():
+    op.drop_column('campaigns', 'version')
@@ -0,0 +1,37 @@
+"""Per-campaign stats rollup
+
+Revision ID: 0006_campaign_stats
+Revises: 0005_campaign_version
+Create Date: 2026-10-19
+
+Created empty; 0012_backfill_campaign_stats counts existing posts into it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_campaign_stats'
+down_revision = '0005_campaign_version'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'campaign_stats',
+        sa.Column('campaign_id', sa.String(), primary_key=True),
+        sa.Column('pending_posts', sa.Integer(), nullable=False),
+        sa.Column('caption_ready_posts', sa.Integer(), nullable=False),
+        sa.Column('completed_posts', sa.Integer(), nullable=False),
+        sa.Column('failed_posts', sa.Integer(), nullable=False),
+        sa.Column('caption_seconds', sa.Float(), nullable=False),
+        sa.Column('caption_samples', sa.Integer(), nullable=False),
+        sa.Column('image_seconds', sa.Float(), nullable=False),
+        sa.Column('image_samples', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('image_count', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table('campaign_stats')
@@ -0,0 +1,21 @@
+"""Cancelled post counters on batch jobs and campaign stats
+
+Revision ID: 0007_batch_cancellation
+Revises: 0006_campaign_stats
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_batch_cancellation'
+down_revision = '0006_campaign_stats'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('batch_jobs', sa.Column('cancelled_posts', sa.Integer(), server_default='0'))
+    op.add_column('campaign_stats', sa.Column('cancelled_posts', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    op.drop_column('campaign_stats', 'cancelled_posts')
+    op.drop_column('batch_jobs', 'cancelled_posts')
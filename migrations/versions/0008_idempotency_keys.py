@@ -0,0 +1,28 @@
+"""Idempotency keys for generate-batch
+
+Revision ID: 0008_idempotency_keys
+Revises: 0007_batch_cancellation
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_idempotency_keys'
+down_revision = '0007_batch_cancellation'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('username', sa.String(50), primary_key=True),
+        sa.Column('key', sa.String(255), primary_key=True),
+        sa.Column('fingerprint', sa.String(64), nullable=False),
+        sa.Column('batch_job_id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+def downgrade():
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,106 @@
+"""Move post text to campaign_post_contents and partition campaign_posts
+
+Revision ID: 0009_partition_campaign_posts
+Revises: 0008_idempotency_keys
+Create Date: 2026-10-19
+
+Briefs and captions are copied into campaign_post_contents. An existing
+table can't be turned into a partitioned one, so campaign_posts is
+renamed, rebuilt (partitioned by storage_tier on PostgreSQL, with the
+tier in the primary key), refilled with every post in the hot tier and
+the old table dropped. Everything happens in one transaction that holds
+an exclusive lock on campaign_posts - run it in a maintenance window on
+large databases.
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_partition_campaign_posts'
+down_revision = '0008_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+# Columns that stay on campaign_posts
+POST_COLUMNS = (
+    'id', 'batch_job_id', 'campaign_id', 'brand_name', 'topic', 'tone', 'target_audience',
+    'generated_image_url', 'status', 'error_message', 'prompt_tokens', 'completion_tokens',
+    'image_count', 'cost_usd', 'template_version', 'created_at', 'updated_at'
+)
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    op.create_table(
+        'campaign_post_contents',
+        sa.Column('post_id', sa.String(), primary_key=True),
+        sa.Column('brief', sa.Text()),
+        sa.Column('generated_caption', sa.Text()),
+    )
+    op.execute(
+        "INSERT INTO campaign_post_contents (post_id, brief, generated_caption) "
+        "SELECT id, brief, generated_caption FROM campaign_posts"
+    )
+
+    _rename_posts('campaign_posts_unpartitioned', postgres)
+    op.create_table(
+        'campaign_posts',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('storage_tier', sa.String(8), nullable=False, server_default='hot'),
+        *_post_columns(),
+        sa.PrimaryKeyConstraint('id', 'storage_tier'),
+        postgresql_partition_by='LIST (storage_tier)',
+    )
+    if postgres:
+        op.execute("CREATE TABLE campaign_posts_hot PARTITION OF campaign_posts FOR VALUES IN ('hot') "
+                   "WITH (fillfactor = 80)")
+        tablespace = os.getenv("COLD_TABLESPACE")
+        op.execute("CREATE TABLE campaign_posts_cold PARTITION OF campaign_posts FOR VALUES IN ('cold')"
+                   + (f' TABLESPACE "{tablespace}"' if tablespace else ""))
+    columns = ', '.join(POST_COLUMNS)
+    op.execute(f"INSERT INTO campaign_posts ({columns}) SELECT {columns} FROM campaign_posts_unpartitioned")
+    op.drop_table('campaign_posts_unpartitioned')
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    _rename_posts('campaign_posts_partitioned', postgres)
+    op.create_table(
+        'campaign_posts',
+        sa.Column('id', sa.String(), primary_key=True),
+        *_post_columns(),
+        sa.Column('brief', sa.Text()),
+        sa.Column('generated_caption', sa.Text()),
+    )
+    columns = ', '.join(POST_COLUMNS)
+    op.execute(
+        f"INSERT INTO campaign_posts ({columns}, brief, generated_caption) "
+        f"SELECT {', '.join('p.' + column for column in POST_COLUMNS)}, c.brief, c.generated_caption "
+        "FROM campaign_posts_partitioned p LEFT JOIN campaign_post_contents c ON c.post_id = p.id"
+    )
+    op.drop_table('campaign_posts_partitioned')
+    op.drop_table('campaign_post_contents')
+
+def _rename_posts(name, postgres):
+    op.rename_table('campaign_posts', name)
+    if postgres:
+        # Free the primary key's name for the new table
+        op.execute(f"ALTER TABLE {name} RENAME CONSTRAINT campaign_posts_pkey TO {name}_pkey")
+
+def _post_columns():
+    return [
+        sa.Column('batch_job_id', sa.String(), nullable=False),
+        sa.Column('campaign_id', sa.String(), nullable=False),
+        sa.Column('brand_name', sa.String(), nullable=False),
+        sa.Column('topic', sa.String()),
+        sa.Column('tone', sa.String(), nullable=False),
+        sa.Column('target_audience', sa.String()),
+        sa.Column('generated_image_url', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('error_message', sa.Text()),
+        sa.Column('prompt_tokens', sa.Integer(), server_default='0'),
+        sa.Column('completion_tokens', sa.Integer(), server_default='0'),
+        sa.Column('image_count', sa.Integer(), server_default='0'),
+        sa.Column('cost_usd', sa.Float(), server_default='0'),
+        sa.Column('template_version', sa.String(64)),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    ]
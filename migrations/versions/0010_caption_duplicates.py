@@ -0,0 +1,37 @@
+"""Near-duplicate caption detection
+
+Revision ID: 0010_caption_duplicates
+Revises: 0009_partition_campaign_posts
+Create Date: 2026-10-19
+
+Existing captions get no signature, so they are not matched against.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010_caption_duplicates'
+down_revision = '0009_partition_campaign_posts'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('campaign_posts', sa.Column('duplicate_of', sa.String()))
+    op.create_table(
+        'caption_signatures',
+        sa.Column('post_id', sa.String(), primary_key=True),
+        sa.Column('campaign_id', sa.String(), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_caption_signatures_campaign_id', 'caption_signatures', ['campaign_id'])
+    op.create_table(
+        'caption_lsh_buckets',
+        sa.Column('campaign_id', sa.String(), primary_key=True),
+        sa.Column('bucket', sa.BigInteger(), primary_key=True),
+        sa.Column('post_id', sa.String(), primary_key=True),
+    )
+
+def downgrade():
+    op.drop_table('caption_lsh_buckets')
+    op.drop_table('caption_signatures')
+    op.drop_column('campaign_posts', 'duplicate_of')
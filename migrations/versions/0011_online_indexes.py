@@ -0,0 +1,79 @@
+"""Indexes for post listings, batch processing and batch history
+
+Revision ID: 0011_online_indexes
+Revises: 0010_caption_duplicates
+Create Date: 2026-10-19
+
+Built without blocking writes on PostgreSQL: CREATE INDEX CONCURRENTLY
+can't run in a transaction or on a partitioned table, so the parent index
+is created ON ONLY campaign_posts (invalid until complete), each partition
+is indexed concurrently and attached, which makes the parent valid.
+"""
+from alembic import op
+
+revision = '0011_online_indexes'
+down_revision = '0010_caption_duplicates'
+branch_labels = None
+depends_on = None
+
+# (index, table, columns)
+INDEXES = (
+    ('ix_campaign_posts_campaign_id_created_at', 'campaign_posts', ('campaign_id', 'created_at')),
+    ('ix_campaign_posts_batch_job_id_status', 'campaign_posts', ('batch_job_id', 'status')),
+    ('ix_batch_jobs_campaign_id', 'batch_jobs', ('campaign_id',)),
+)
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, list(columns))
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            column_list = ', '.join(columns)
+            partitions = _partitions(table)
+            if partitions is None:
+                _drop_if_invalid(name)
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_list})")
+                continue
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({column_list})")
+            for partition in partitions:
+                partition_index = f"{partition}_{'_'.join(columns)}_idx"
+                # A failed concurrent build leaves an invalid index behind; rebuild it
+                _drop_if_invalid(partition_index)
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} ({column_list})"
+                )
+                if not _attached(partition_index):
+                    op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+def _partitions(table):
+    """Partition names of a partitioned table, None for a plain table"""
+    bind = op.get_bind()
+    partitioned = bind.exec_driver_sql(
+        f"SELECT relkind = 'p' FROM pg_class WHERE oid = '{table}'::regclass"
+    ).scalar()
+    if not partitioned:
+        return None
+    return [row[0] for row in bind.exec_driver_sql(
+        f"SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = '{table}'::regclass ORDER BY 1"
+    )]
+
+def _drop_if_invalid(index):
+    invalid = op.get_bind().exec_driver_sql(
+        "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%(index)s)",
+        {"index": index}
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+def _attached(index):
+    return bool(op.get_bind().exec_driver_sql(
+        "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%(index)s)",
+        {"index": index}
+    ).scalar())
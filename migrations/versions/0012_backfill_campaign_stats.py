@@ -0,0 +1,72 @@
+"""Backfill campaign_stats from campaign_posts
+
+Revision ID: 0012_backfill_campaign_stats
+Revises: 0011_online_indexes
+Create Date: 2026-10-19
+
+The rollup is only incremented at runtime, so a campaign whose posts
+predate it got a row holding just the changes made since - and kept
+reporting only its new posts. Recount every campaign's post counters and
+usage from campaign_posts; latency sums are kept where a row exists.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0012_backfill_campaign_stats'
+down_revision = '0011_online_indexes'
+branch_labels = None
+depends_on = None
+
+posts = sa.table(
+    'campaign_posts',
+    sa.column('campaign_id', sa.String), sa.column('status', sa.String),
+    sa.column('prompt_tokens', sa.Integer), sa.column('completion_tokens', sa.Integer),
+    sa.column('image_count', sa.Integer), sa.column('cost_usd', sa.Float),
+)
+stats = sa.table(
+    'campaign_stats',
+    *[sa.column(name) for name in (
+        'campaign_id', 'pending_posts', 'caption_ready_posts', 'completed_posts', 'failed_posts',
+        'cancelled_posts', 'caption_seconds', 'caption_samples', 'image_seconds', 'image_samples',
+        'prompt_tokens', 'completion_tokens', 'image_count', 'cost_usd', 'updated_at'
+    )]
+)
+
+# Counter column -> post statuses it counts
+_STATUS_COUNTERS = (
+    ('pending_posts', ('pending', 'processing')),
+    ('caption_ready_posts', ('caption_ready',)),
+    ('completed_posts', ('completed',)),
+    ('failed_posts', ('failed',)),
+    ('cancelled_posts', ('cancelled',)),
+)
+_USAGE_COLUMNS = ('prompt_tokens', 'completion_tokens', 'image_count', 'cost_usd')
+
+def upgrade():
+    totals = sa.select(
+        posts.c.campaign_id,
+        *[sa.func.sum(sa.case((posts.c.status.in_(statuses), 1), else_=0)).label(column)
+          for column, statuses in _STATUS_COUNTERS],
+        *[sa.func.coalesce(sa.func.sum(posts.c[column]), 0).label(column) for column in _USAGE_COLUMNS],
+    ).group_by(posts.c.campaign_id).subquery('totals')
+    counted = [column for column, _ in _STATUS_COUNTERS] + list(_USAGE_COLUMNS)
+
+    op.execute(
+        stats.update()
+        .where(stats.c.campaign_id == totals.c.campaign_id)
+        .values({**{column: totals.c[column] for column in counted}, 'updated_at': sa.func.now()})
+    )
+    op.execute(
+        stats.insert().from_select(
+            ['campaign_id'] + counted + ['caption_seconds', 'caption_samples', 'image_seconds', 'image_samples',
+                                         'updated_at'],
+            sa.select(
+                totals.c.campaign_id, *[totals.c[column] for column in counted],
+                sa.literal(0.0), sa.literal(0), sa.literal(0.0), sa.literal(0), sa.func.now()
+            ).where(~sa.exists().where(stats.c.campaign_id == totals.c.campaign_id))
+        )
+    )
+
+def downgrade():
+    # The recount is still correct under the old code
+    pass
@@ -0,0 +1,23 @@
+"""Post write counter on campaign_stats
+
+Revision ID: 0013_campaign_stats_version
+Revises: 0012_backfill_campaign_stats
+Create Date: 2026-10-19
+
+Bumped with every post write, so the posts listing can revalidate with a
+single-row lookup instead of counting the campaign's posts. A constant
+default makes this a metadata-only change on PostgreSQL 11+.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0013_campaign_stats_version'
+down_revision = '0012_backfill_campaign_stats'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('campaign_stats', sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+def downgrade():
+    op.drop_column('campaign_stats', 'version')
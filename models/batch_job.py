@@ -1,18 +1,21 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index
 from database import Base
 from datetime import datetime
 import uuid
 
 class BatchJob(Base):
     __tablename__ = "batch_jobs"
+    __table_args__ = (Index("ix_batch_jobs_campaign_id", "campaign_id"),)
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     campaign_id = Column(String, nullable=False)
     name = Column(String, nullable=False)
-    status = Column(String, default="pending")  # pending, processing, completed, failed
+    status = Column(String, default="pending")  # pending, processing, paused, cancelling, cancelled, completed, completed_with_errors
     total_posts = Column(Integer, default=0)
     completed_posts = Column(Integer, default=0)
+    captions_ready = Column(Integer, default=0)  # Posts whose caption is done (image may be pending)
     failed_posts = Column(Integer, default=0)
+    cancelled_posts = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     error_log = Column(Text, nullable=True)
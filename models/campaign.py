@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from database import Base
 from datetime import datetime
@@ -15,5 +15,6 @@ class Campaign(Base):
     target_audience = Column(Text, nullable=True)
     tone_id = Column(String(20), nullable=True)
     status = Column(String(20), nullable=True, default="draft")
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every write; part of the ETag
     created_at = Column(DateTime(timezone=True), nullable=True, default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
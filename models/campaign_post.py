@@ -1,22 +1,83 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, Float, DDL, Index, event
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Query, relationship
 from database import Base
+from models.campaign_post_content import CampaignPostContent
 from datetime import datetime
+import os
 import uuid
 
+HOT_TIER = "hot"
+COLD_TIER = "cold"
+
+# Post fields stored in campaign_post_contents rather than campaign_posts
+CONTENT_FIELDS = ('brief', 'generated_caption')
+
+# Optional tablespace (e.g. on cheaper disks) for the cold partition
+COLD_TABLESPACE = os.getenv("COLD_TABLESPACE")
+
 class CampaignPost(Base):
     __tablename__ = "campaign_posts"
+    # On PostgreSQL the table is partitioned by storage tier: posts being
+    # generated and browsed stay in the small hot partition, the archival
+    # job moves finished posts of closed campaigns to the cold one.
+    # Indexes are created by migration 0011 (concurrently on PostgreSQL)
+    __table_args__ = (
+        Index("ix_campaign_posts_campaign_id_created_at", "campaign_id", "created_at"),
+        Index("ix_campaign_posts_batch_job_id_status", "batch_job_id", "status"),
+        {"postgresql_partition_by": "LIST (storage_tier)"},
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Partitioned tables need the partition key in the primary key
+    storage_tier = Column(String(8), primary_key=True, default=HOT_TIER, server_default=HOT_TIER)
     batch_job_id = Column(String, nullable=False)
     campaign_id = Column(String, nullable=False)
     brand_name = Column(String, nullable=False)
     topic = Column(String, nullable=True)
     tone = Column(String, nullable=False)
-    brief = Column(Text, nullable=True)
     target_audience = Column(String, nullable=True)
-    generated_caption = Column(Text, nullable=True)
     generated_image_url = Column(String, nullable=True)
-    status = Column(String, default="pending")  # pending, processing, completed, failed
+    status = Column(String, default="pending")  # pending, processing, caption_ready, completed, failed, cancelled
     error_message = Column(Text, nullable=True)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    image_count = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    template_version = Column(String(64), nullable=True)  # Prompt templates used, e.g. caption@v2,image@v2
+    duplicate_of = Column(String, nullable=True)  # Earlier post of the campaign with a near-identical caption
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Brief and caption live in campaign_post_contents and are loaded on
+    # first access; status updates only rewrite the narrow post row
+    content = relationship(
+        CampaignPostContent,
+        primaryjoin="CampaignPost.id == foreign(CampaignPostContent.post_id)",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
+    brief = association_proxy("content", "brief", creator=lambda value: CampaignPostContent(brief=value))
+    generated_caption = association_proxy(
+        "content", "generated_caption", creator=lambda value: CampaignPostContent(generated_caption=value)
+    )
+
+    # The row is identified by id alone; storage_tier can change under it
+    __mapper_args__ = {"primary_key": [id]}
+
+def with_post_fields(query: Query, fields) -> Query:
+    """query.with_entities() for post field names, joining contents only when a content field is asked for"""
+    columns = [getattr(CampaignPostContent if field in CONTENT_FIELDS else CampaignPost, field) for field in fields]
+    if any(field in CONTENT_FIELDS for field in fields):
+        query = query.outerjoin(CampaignPostContent, CampaignPostContent.post_id == CampaignPost.id)
+    return query.with_entities(*columns)
+
+# Status updates rewrite hot rows constantly - leave room on each page for HOT updates
+event.listen(CampaignPost.__table__, "after_create", DDL(
+    f"CREATE TABLE campaign_posts_hot PARTITION OF campaign_posts FOR VALUES IN ('{HOT_TIER}') "
+    "WITH (fillfactor = 80)"
+).execute_if(dialect="postgresql"))
+event.listen(CampaignPost.__table__, "after_create", DDL(
+    f"CREATE TABLE campaign_posts_cold PARTITION OF campaign_posts FOR VALUES IN ('{COLD_TIER}')"
+    + (f' TABLESPACE "{COLD_TABLESPACE}"' if COLD_TABLESPACE else "")
+).execute_if(dialect="postgresql"))
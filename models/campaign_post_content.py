@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text
+from database import Base
+
+class CampaignPostContent(Base):
+    """Large text of a campaign post, kept out of the frequently updated post row.
+
+    One row per post (same id), loaded only when the brief or caption is read.
+    """
+    __tablename__ = "campaign_post_contents"
+
+    post_id = Column(String, primary_key=True)
+    brief = Column(Text, nullable=True)
+    generated_caption = Column(Text, nullable=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime
+from database import Base
+from datetime import datetime
+
+class CampaignStats(Base):
+    """Running totals per campaign for the stats endpoint.
+
+    Updated in the same transaction as each post status change, so reading
+    it is a single-row lookup however many posts the campaign has.
+    """
+    __tablename__ = "campaign_stats"
+
+    campaign_id = Column(String, primary_key=True)
+    # Current number of posts in each status
+    pending_posts = Column(Integer, nullable=False, default=0)  # pending or processing
+    caption_ready_posts = Column(Integer, nullable=False, default=0)
+    completed_posts = Column(Integer, nullable=False, default=0)
+    failed_posts = Column(Integer, nullable=False, default=0)
+    cancelled_posts = Column(Integer, nullable=False, default=0)
+    # Latency sums and sample counts for averages
+    caption_seconds = Column(Float, nullable=False, default=0.0)
+    caption_samples = Column(Integer, nullable=False, default=0)
+    image_seconds = Column(Float, nullable=False, default=0.0)
+    image_samples = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    image_count = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    # Bumped on every post write; the posts listing's ETag is built from it
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
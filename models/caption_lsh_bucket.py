@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, BigInteger
+from database import Base
+
+class CaptionLshBucket(Base):
+    """LSH band bucket a caption signature falls in, one row per band.
+
+    Captions sharing any bucket within a campaign are candidate near-duplicates.
+    """
+    __tablename__ = "caption_lsh_buckets"
+
+    campaign_id = Column(String, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)  # Hash of the band index and its signature rows
+    post_id = Column(String, primary_key=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, LargeBinary, DateTime, Index
+from database import Base
+from datetime import datetime
+
+class CaptionSignature(Base):
+    """MinHash signature of a post's generated caption (uint32 array as bytes)"""
+    __tablename__ = "caption_signatures"
+
+    post_id = Column(String, primary_key=True)
+    campaign_id = Column(String, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_caption_signatures_campaign_id", "campaign_id"),)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, Index
+from database import Base
+from datetime import datetime
+
+class IdempotencyKey(Base):
+    """Idempotency-Key sent with a generate-batch request and the batch it created.
+
+    Keys are scoped per user. Expired rows are deleted in bulk.
+    """
+    __tablename__ = "idempotency_keys"
+
+    username = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the canonical request
+    batch_job_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
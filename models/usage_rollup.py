@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime
+from database import Base
+from datetime import datetime
+
+class UsageRollup(Base):
+    """Token/image usage per user, campaign and billing period (YYYY-MM).
+
+    Maintained incrementally as posts are generated - never recomputed
+    from campaign_posts.
+    """
+    __tablename__ = "usage_rollups"
+
+    username = Column(String(50), primary_key=True)
+    campaign_id = Column(String, primary_key=True)
+    period = Column(String(7), primary_key=True)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    image_count = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from models.campaign import Campaign
+from models.campaign_post import CampaignPost, HOT_TIER, COLD_TIER
+
+# Campaigns in these statuses are done with; their posts can go cold
+CLOSED_CAMPAIGN_STATUSES = tuple(
+    status.strip() for status in os.getenv("CLOSED_CAMPAIGN_STATUSES", "completed,archived,deleted").split(",")
+    if status.strip()
+)
+
+# A closed campaign is only archived once it hasn't changed for this long
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+
+# Posts moved per transaction, so archiving never holds long row locks
+ARCHIVE_CHUNK_POSTS = int(os.getenv("ARCHIVE_CHUNK_POSTS", "5000"))
+
+# Only finished posts move - anything still being generated stays hot
+_ARCHIVABLE_STATUSES = ('completed', 'failed', 'cancelled')
+
+class ArchiveService:
+    """Moves posts between the hot and cold campaign_posts partitions.
+
+    Changing storage_tier makes PostgreSQL move the row to the other
+    partition. Elsewhere it's just a column, so the job is harmless there.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def closed_campaign_ids(self, older_than_days: float = ARCHIVE_AFTER_DAYS) -> List[str]:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        rows = self.db.query(Campaign.id).filter(
+            Campaign.status.in_(CLOSED_CAMPAIGN_STATUSES),
+            Campaign.updated_at < cutoff
+        ).all()
+        return [str(campaign_id) for campaign_id, in rows]
+
+    def archive_closed_campaigns(self, older_than_days: float = ARCHIVE_AFTER_DAYS) -> Dict:
+        campaign_ids = self.closed_campaign_ids(older_than_days)
+        moved = sum(self.archive_campaign(campaign_id) for campaign_id in campaign_ids)
+        print(f"Archived {moved} posts from {len(campaign_ids)} closed campaigns")
+        return {'campaigns': len(campaign_ids), 'archived_posts': moved}
+
+    def archive_campaign(self, campaign_id: str) -> int:
+        """Move a campaign's finished posts to the cold partition"""
+        return self._move(campaign_id, HOT_TIER, COLD_TIER, _ARCHIVABLE_STATUSES)
+
+    def restore_campaign(self, campaign_id: str) -> int:
+        """Bring an archived campaign's posts back to the hot partition, e.g. when it's reopened"""
+        return self._move(campaign_id, COLD_TIER, HOT_TIER)
+
+    def _move(self, campaign_id: str, from_tier: str, to_tier: str, statuses=None) -> int:
+        moved = 0
+        while True:
+            query = self.db.query(CampaignPost.id).filter(
+                CampaignPost.campaign_id == campaign_id,
+                CampaignPost.storage_tier == from_tier
+            )
+            if statuses:
+                query = query.filter(CampaignPost.status.in_(statuses))
+            post_ids = [post_id for post_id, in query.limit(ARCHIVE_CHUNK_POSTS).all()]
+            if not post_ids:
+                return moved
+            # updated_at is kept: the posts' content hasn't changed
+            self.db.query(CampaignPost).filter(
+                CampaignPost.id.in_(post_ids),
+                CampaignPost.storage_tier == from_tier
+            ).update(
+                {CampaignPost.storage_tier: to_tier, CampaignPost.updated_at: CampaignPost.updated_at},
+                synchronize_session=False
+            )
+            self.db.commit()
+            moved += len(post_ids)
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import get_engine
+
+# Postgres channel carrying "<batch id>:<action>" payloads
+CONTROL_CHANNEL = os.getenv("BATCH_CONTROL_CHANNEL", "batch_control")
+
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+
+_ACTION_STATES = {"pause": PAUSED, "resume": RUNNING, "cancel": CANCELLED}
+
+# Batch job statuses that mean the runner should stop or hold
+_STATUS_STATES = {"paused": PAUSED, "cancelling": CANCELLED, "cancelled": CANCELLED}
+
+class BatchControl:
+    """Cancel/pause signals for batches running in this process.
+
+    Workers check the in-memory state before claiming each post, so there's
+    no per-post database polling. Signals reach every node through
+    PostgreSQL LISTEN/NOTIFY; the notification is sent when the endpoint's
+    transaction commits, together with the new batch status. Without
+    PostgreSQL (single-process setups) signals are applied in-process.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, str] = {}
+        self._resumed: Dict[str, asyncio.Event] = {}
+        self._tasks: Dict[str, Set[asyncio.Task]] = {}
+        self._runs: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        # Set on shutdown: no new batches are admitted while running ones finish
+        self.draining = False
+
+    def register(self, batch_id: str, status: Optional[str] = None):
+        """Start tracking a batch run; status is the batch job's current DB status"""
+        self._ensure_listening()
+        self._runs[batch_id] = self._runs.get(batch_id, 0) + 1
+        if batch_id not in self._states:
+            self._states[batch_id] = _STATUS_STATES.get(status, RUNNING)
+            event = self._resumed[batch_id] = asyncio.Event()
+            if self._states[batch_id] != PAUSED:
+                event.set()
+            self._tasks[batch_id] = set()
+
+    def unregister(self, batch_id: str):
+        self._runs[batch_id] = self._runs.get(batch_id, 1) - 1
+        if self._runs[batch_id] <= 0:
+            for registry in (self._runs, self._states, self._resumed, self._tasks):
+                registry.pop(batch_id, None)
+
+    def track(self, batch_id: str, task: asyncio.Task):
+        """Worker tasks are cancelled when their batch is"""
+        tasks = self._tasks.get(batch_id)
+        if tasks is not None:
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    def is_running(self, batch_id: str) -> bool:
+        return batch_id in self._runs
+
+    def cancelled(self, batch_id: str) -> bool:
+        return self._states.get(batch_id) == CANCELLED
+
+    async def wait_if_paused(self, batch_id: str):
+        event = self._resumed.get(batch_id)
+        if event is not None and not event.is_set():
+            await event.wait()
+
+    def running(self) -> List[str]:
+        return list(self._runs)
+
+    async def drain(self, timeout: float) -> List[str]:
+        """Stop admitting batches and wait for running ones; returns those still running at the deadline"""
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while self._runs and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+        return self.running()
+
+    def publish(self, db: Session, batch_id: str, action: str):
+        """Signal every node running the batch (delivered when db commits)"""
+        if action not in _ACTION_STATES:
+            raise ValueError(f"Unknown batch control action: {action}")
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": CONTROL_CHANNEL, "payload": f"{batch_id}:{action}"})
+        else:
+            self.apply(batch_id, action)
+
+    def apply(self, batch_id: str, action: str):
+        if batch_id not in self._states:
+            return
+        state = _ACTION_STATES.get(action)
+        if state is None or self._states[batch_id] == CANCELLED:
+            return
+        print(f"Batch {batch_id}: {action}")
+        self._states[batch_id] = state
+        if state == PAUSED:
+            self._resumed[batch_id].clear()
+            return
+        # Running or cancelled - wake paused workers either way
+        self._resumed[batch_id].set()
+        if state == CANCELLED:
+            for task in list(self._tasks[batch_id]):
+                task.cancel()
+
+    def _ensure_listening(self):
+        if self._listener is not None or get_engine().dialect.name != "postgresql":
+            return
+        self._loop = asyncio.get_running_loop()
+        self._listener = threading.Thread(target=self._listen, name="batch-control-listener", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        # Dedicated connection outside the pool, reconnecting on failure
+        while True:
+            connection = None
+            try:
+                connection = get_engine().raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{CONTROL_CHANNEL}"')
+                while True:
+                    if select.select([dbapi_connection], [], [], 5.0) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        batch_id, _, action = notify.payload.rpartition(":")
+                        self._loop.call_soon_threadsafe(self.apply, batch_id, action)
+            except Exception as e:
+                print(f"Batch control listener error, reconnecting: {str(e)}")
+                time.sleep(1.0)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+# Global instance
+batch_control = BatchControl()
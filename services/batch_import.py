@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models.batch_job import BatchJob
+from models.campaign_post import CampaignPost, HOT_TIER
+from models.campaign_post_content import CampaignPostContent
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Rows buffered before each bulk load - bounds memory whatever the file size
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+
+# Row errors returned in full; the rejected count always covers every row
+MAX_REPORTED_ERRORS = 200
+
+_POST_FIELDS = ('brand_name', 'topic', 'tone', 'target_audience')
+
+# Column order for COPY; every value is filled in Python since COPY skips ORM defaults
+_COPY_COLUMNS = (
+    'id', 'storage_tier', 'batch_job_id', 'campaign_id', 'brand_name', 'topic', 'tone', 'target_audience',
+    'status', 'prompt_tokens', 'completion_tokens', 'image_count', 'cost_usd', 'created_at', 'updated_at'
+)
+
+# Briefs go to the content table; posts without one get their content row with the caption
+_COPY_CONTENT_COLUMNS = ('post_id', 'brief')
+
+class ImportFormatError(ValueError):
+    """The upload as a whole can't be read (bad format, missing columns)"""
+    pass
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> str:
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ImportFormatError(f"Unsupported import format '{requested}', expected one of {', '.join(IMPORT_FORMATS)}")
+        return requested
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    raise ImportFormatError("Can't tell the file format from its name - pass format=csv or format=jsonl")
+
+def iter_rows(raw: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yield (line, row, error) one record at a time straight off the file"""
+    text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            if not reader.fieldnames:
+                raise ImportFormatError("CSV file is empty")
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+            for required in ('brand_name', 'tone'):
+                if required not in reader.fieldnames:
+                    raise ImportFormatError(f"CSV header is missing the '{required}' column")
+            for row in reader:
+                # Blank cells fall back to the field defaults
+                yield reader.line_num, {key: value for key, value in row.items() if key and value}, None
+        else:
+            for line_num, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_num, None, f"Invalid JSON: {str(e)}"
+                    continue
+                if not isinstance(row, dict):
+                    yield line_num, None, "Each line must be a JSON object"
+                    continue
+                yield line_num, row, None
+    except UnicodeDecodeError:
+        raise ImportFormatError("File is not valid UTF-8")
+    finally:
+        # Leave the underlying upload open for the framework to clean up
+        text.detach()
+
+class PostBulkLoader:
+    """Buffers validated rows and writes them to campaign_posts in chunks.
+
+    On PostgreSQL each chunk goes in with a single COPY per table; other
+    databases get one executemany insert per table and chunk. Rows are
+    written on the caller's transaction, so nothing is visible until the
+    caller commits.
+    """
+
+    def __init__(self, db: Session, batch_job: BatchJob, chunk_rows: int = IMPORT_CHUNK_ROWS):
+        self.db = db
+        self.batch_job = batch_job
+        self.chunk_rows = chunk_rows
+        self.loaded = 0
+        self._rows: List[Dict] = []
+        self._content_rows: List[Dict] = []
+        self._use_copy = db.get_bind().dialect.name == "postgresql"
+
+    def add(self, post_data: Dict):
+        now = datetime.utcnow()
+        row = {field: post_data.get(field) for field in _POST_FIELDS}
+        post_id = str(uuid.uuid4())
+        if post_data.get('brief'):
+            self._content_rows.append({'post_id': post_id, 'brief': post_data['brief']})
+        row.update(
+            id=post_id,
+            storage_tier=HOT_TIER,
+            batch_job_id=str(self.batch_job.id),
+            campaign_id=self.batch_job.campaign_id,
+            status='pending',
+            prompt_tokens=0,
+            completion_tokens=0,
+            image_count=0,
+            cost_usd=0.0,
+            created_at=now,
+            updated_at=now,
+        )
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self._use_copy:
+            self._copy(CampaignPost.__tablename__, _COPY_COLUMNS, self._rows)
+            self._copy(CampaignPostContent.__tablename__, _COPY_CONTENT_COLUMNS, self._content_rows)
+        else:
+            self.db.execute(CampaignPost.__table__.insert(), self._rows)
+            if self._content_rows:
+                self.db.execute(CampaignPostContent.__table__.insert(), self._content_rows)
+        self.loaded += len(self._rows)
+        self._rows = []
+        self._content_rows = []
+
+    def _copy(self, table: str, columns: Tuple[str, ...], rows: List[Dict]):
+        copy_rows(self.db, table, columns, rows)
+
+def copy_rows(db: Session, table: str, columns: Tuple[str, ...], rows: List[Dict]):
+    """Bulk-load rows with one COPY ... FORMAT csv on the session's connection (PostgreSQL only)"""
+    if not rows:
+        return
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_csv_field(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def _csv_field(value) -> str:
+    # COPY reads an unquoted empty field as NULL and a quoted "" as an empty
+    # string. csv.writer quotes None as "" too, so fields are written here.
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+def import_posts(db: Session, batch_job: BatchJob, raw: BinaryIO, fmt: str,
+                 validate: Callable[[Dict], Dict]) -> Dict:
+    """Stream-parse an upload, validate each row and bulk-load the good ones.
+
+    validate turns a raw row into post data or raises ValueError. Invalid
+    rows are skipped and reported by line number. Nothing is committed.
+    """
+    loader = PostBulkLoader(db, batch_job)
+    rejected = 0
+    errors = []
+
+    for line_num, row, error in iter_rows(raw, fmt):
+        if error is None:
+            try:
+                loader.add(validate(row))
+                continue
+            except ValueError as e:
+                error = str(e)
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line_num, 'error': error})
+
+    loader.flush()
+    return {
+        'imported_posts': loader.loaded,
+        'rejected_rows': rejected,
+        'errors': errors,
+    }
@@ -0,0 +1,160 @@
+import math
+import os
+from typing import Dict, List
+import numpy as np
+from services import usage_service
+from services.metrics import caption_latency, image_latency
+from services.prompt_templates import CAPTION_TEMPLATE, PACKED_CAPTION_TEMPLATE, PACKED_ITEM_TEMPLATE, tone_registry
+from services.scheduler import generation_scheduler, image_scheduler, post_backlog
+from services.batch_service import CAPTION_PACK_SIZE
+
+# Briefs longer than this are rejected - they only inflate prompt tokens
+MAX_BRIEF_CHARS = int(os.getenv("MAX_BRIEF_CHARS", "1500"))
+
+# Rough English average for OpenAI tokenizers
+CHARS_PER_TOKEN = 4.0
+
+# Used until the latency histograms have samples
+DEFAULT_CAPTION_SECONDS = 4.0
+DEFAULT_IMAGE_SECONDS = 15.0
+
+# Issue details returned in full; counts always cover every post
+MAX_REPORTED_ISSUES = 200
+
+_FIELDS = ('brand_name', 'topic', 'tone', 'brief', 'target_audience')
+
+def _lengths(values: List[str]) -> np.ndarray:
+    return np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+
+def plan_batch(posts: List[Dict], pack_captions: bool = False) -> Dict:
+    """Validate a batch and estimate its tokens, cost and wall time.
+
+    Each field is pulled out once as a column and every check and estimate
+    is a NumPy operation over the whole batch, so large batches plan in
+    milliseconds. Tones are checked against the registry as currently
+    loaded; callers refresh it first.
+    """
+    total = len(posts)
+    columns = {field: [str(post.get(field) or '') for post in posts] for field in _FIELDS}
+    columns['tone'] = [tone.strip().lower() for tone in columns['tone']]
+    lengths = {field: _lengths(columns[field]) for field in _FIELDS}
+
+    # Map every post to its tone's position in a small table of distinct tones
+    tone_ids: Dict[str, int] = {}
+    tone_index = np.fromiter(
+        (tone_ids.setdefault(tone, len(tone_ids)) for tone in columns['tone']),
+        dtype=np.int64, count=total
+    )
+    unique_tones = list(tone_ids)
+
+    # Validation masks; duplicates are reported but still counted as valid
+    tone_ok = np.array([tone_registry.is_known(tone) for tone in unique_tones], dtype=bool)
+    checks = {
+        'missing_brand_name': lengths['brand_name'] == 0,
+        'missing_tone': lengths['tone'] == 0,
+        'unknown_tone': ~tone_ok[tone_index] & (lengths['tone'] > 0),
+        'brief_too_long': lengths['brief'] > MAX_BRIEF_CHARS,
+    }
+
+    # Duplicates: identical posts (tone normalised), keeping the first
+    keys = np.fromiter(map(hash, zip(*(columns[field] for field in _FIELDS))), dtype=np.int64, count=total)
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    checks['duplicate'] = first_index[inverse] != np.arange(total)
+
+    invalid = np.zeros(total, dtype=bool)
+    for name, mask in checks.items():
+        if name != 'duplicate':
+            invalid |= mask
+    valid = ~invalid
+    valid_count = int(valid.sum())
+
+    issues = []
+    for name, mask in checks.items():
+        for index in np.flatnonzero(mask)[:MAX_REPORTED_ISSUES - len(issues)]:
+            issue = {'index': int(index), 'issue': name}
+            if name == 'duplicate':
+                issue['duplicate_of'] = int(first_index[inverse[index]])
+            issues.append(issue)
+
+    # Token estimate per post from field lengths and the template overhead
+    tone_extra = np.zeros(len(unique_tones), dtype=np.int64)
+    for i, tone in enumerate(unique_tones):
+        known = tone_registry.get(tone)
+        tone_extra[i] = len(known['name']) + len(known['prompt_modifier']) if known else len(tone)
+    tone_chars = tone_extra[tone_index]
+    field_chars = lengths['topic'] + lengths['brief'] + lengths['target_audience']
+
+    post_chars = len(CAPTION_TEMPLATE.render({})) + lengths['brand_name'] + tone_chars + field_chars
+    if pack_captions:
+        # Packed like the batch service does: CAPTION_PACK_SIZE posts per
+        # request within each (brand, tone) group; a chunk of one goes out
+        # as a normal caption request
+        valid_index = np.flatnonzero(valid)
+        group_keys = np.fromiter(map(hash, zip(columns['brand_name'], columns['tone'])), dtype=np.int64, count=total)
+        _, group_of, group_sizes = np.unique(group_keys[valid_index], return_inverse=True, return_counts=True)
+        # Position of each post within its group, in batch order
+        order = np.argsort(group_of, kind='stable')
+        group_starts = np.cumsum(group_sizes) - group_sizes
+        rank = np.empty(len(valid_index), dtype=np.int64)
+        rank[order] = np.arange(len(valid_index)) - np.repeat(group_starts, group_sizes)
+        chunk_start = rank // CAPTION_PACK_SIZE * CAPTION_PACK_SIZE
+        chunk_size = np.minimum(group_sizes[group_of] - chunk_start, CAPTION_PACK_SIZE)
+        single = valid_index[chunk_size == 1]
+        packed = valid_index[chunk_size > 1]
+        # The header (brand + tone + requirements) is paid once per pack, by its first post
+        pack_heads = valid_index[(chunk_size > 1) & (rank == chunk_start)]
+        header_chars = len(PACKED_CAPTION_TEMPLATE.render({})) + lengths['brand_name'] + tone_chars
+        item_chars = len(PACKED_ITEM_TEMPLATE.render({})) + field_chars
+        requests = len(pack_heads) + len(single)
+        prompt_chars = int(item_chars[packed].sum() + header_chars[pack_heads].sum() + post_chars[single].sum())
+    else:
+        requests = valid_count
+        prompt_chars = int(post_chars[valid].sum())
+
+    prompt_tokens = int(math.ceil(prompt_chars / CHARS_PER_TOKEN))
+    completion_tokens = valid_count * usage_service.ESTIMATED_COMPLETION_TOKENS_PER_POST
+    cost = usage_service.estimate_cost(prompt_tokens, completion_tokens, valid_count)
+
+    return {
+        'valid': bool(valid_count == total and not checks['duplicate'].any()),
+        'total_posts': total,
+        'valid_posts': valid_count,
+        'issue_counts': {name: int(mask.sum()) for name, mask in checks.items()},
+        'issues': issues,
+        'estimate': {
+            'caption_requests': requests,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'image_count': valid_count,
+            'cost_usd': round(cost, 4),
+        },
+        'timing': estimate_wall_time(valid_count),
+    }
+
+def estimate_wall_time(post_count: int) -> Dict:
+    """Predict batch duration from live latency quantiles and the current backlog.
+
+    Each stage drains (queued + new) posts at concurrency / latency; the
+    stages overlap, so the slower one dominates plus one pass through the
+    faster one.
+    """
+    queue_depth = post_backlog.posts
+    estimates = {}
+    for label, q in (('p50', 0.5), ('p90', 0.9)):
+        caption_seconds = caption_latency.quantile(q, DEFAULT_CAPTION_SECONDS)
+        image_seconds = image_latency.quantile(q, DEFAULT_IMAGE_SECONDS)
+        if post_count == 0:
+            estimates[label] = 0.0
+            continue
+        posts_ahead = queue_depth + post_count
+        caption_stage = math.ceil(posts_ahead / generation_scheduler.max_concurrent) * caption_seconds
+        image_stage = math.ceil(posts_ahead / image_scheduler.max_concurrent) * image_seconds
+        estimates[label] = round(max(caption_stage, image_stage) + min(caption_seconds, image_seconds), 1)
+
+    return {
+        'queue_depth': queue_depth,
+        'caption_latency': caption_latency.snapshot(),
+        'image_latency': image_latency.snapshot(),
+        'estimated_seconds_p50': estimates['p50'],
+        'estimated_seconds_p90': estimates['p90'],
+    }
@@ -1,129 +1,634 @@
 import asyncio
+import os
 import time
-from asyncio import Semaphore
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from models.batch_job import BatchJob
-from models.campaign_post import CampaignPost
-from services.openai_service import openai_service
+from models.campaign_post import CampaignPost, HOT_TIER
+from services.provider_router import generation_router
+from services.scheduler import generation_scheduler, image_scheduler, post_backlog
+from services.generation_provider import ProviderUnavailable, split_usage
+from services.usage_service import UsageService
+from services.campaign_stats_service import CampaignStatsService
+from services.prompt_templates import template_version
+from services.response_cache import bump_campaign_version
+from services.batch_control import batch_control
+from services.near_duplicates import (
+    NearDuplicateIndex, NEAR_DUPLICATE_ACTION, NEAR_DUPLICATE_MAX_RETRIES, distinct_caption_request, signature
+)
+
+# Posts per packed caption request
+CAPTION_PACK_SIZE = int(os.getenv("CAPTION_PACK_SIZE", "10"))
+
+# How long a post waits for an open circuit breaker before it is failed
+BREAKER_MAX_WAIT_SECONDS = float(os.getenv("BREAKER_MAX_WAIT_SECONDS", "120"))
+
+# Post statuses a cancelled batch still has to mark
+UNFINISHED_STATUSES = ('pending', 'processing', 'caption_ready')
+
+# Batch job statuses after which nothing more will be generated
+FINISHED_BATCH_STATUSES = ('completed', 'completed_with_errors', 'cancelled')
+
+# Posts loaded per pipeline run when generating large imported batches
+GENERATION_CHUNK_POSTS = int(os.getenv("GENERATION_CHUNK_POSTS", "500"))
 
 class BatchGenerationService:
     def __init__(self, db: Session):
         self.db = db
-        self.max_concurrent = 10  # Increased from 5 to 10 for better throughput
-        
-    async def process_batch(self, batch_job_id: str, posts_data: List[Dict]) -> Dict[str, Any]:
+        # Posts are owned by this service while a batch runs - don't reload
+        # every row from the database after each progress commit
+        self.db.expire_on_commit = False
+        self.usage_service = UsageService(db)
+        self.stats_service = CampaignStatsService(db)
+        self.duplicate_index = NearDuplicateIndex(db)
+        self._deferred_since: Dict[str, float] = {}
+
+    async def process_batch(self, batch_job_id: str, posts_data: List[Dict], priority: str = "normal",
+                            pack_captions: bool = False) -> Dict[str, Any]:
         """Main batch processing function - THIS IS YOUR CORE CHALLENGE"""
-        
+
         # Update batch job status
         batch_job = self.db.query(BatchJob).filter(BatchJob.id == batch_job_id).first()
         batch_job.status = "processing"
         batch_job.total_posts = len(posts_data)
+
+        # Create all post records up front so they show up as pending right away
+        posts = [
+            CampaignPost(
+                campaign_id=batch_job.campaign_id,
+                batch_job_id=batch_job_id,
+                brand_name=post_data.get('brand_name'),
+                topic=post_data.get('topic'),
+                tone=post_data.get('tone'),
+                brief=post_data.get('brief'),
+                target_audience=post_data.get('target_audience'),
+                status='pending'
+            )
+            for post_data in posts_data
+        ]
+        self.db.add_all(posts)
+        self.stats_service.add_posts(batch_job.campaign_id, len(posts))
         self.db.commit()
-        
-        # Create semaphore for rate limiting
-        semaphore = Semaphore(self.max_concurrent)
-        
-        async def process_single_post(post_data: Dict, index: int) -> Dict:
-            """Process individual post with rate limiting"""
-            async with semaphore:
-                post = None
-                try:
-                    print(f"Processing post {index + 1}/{len(posts_data)}: {post_data.get('brand_name', 'Unknown Brand')}")
-                    
-                    # Create database record first
-                    post = CampaignPost(
-                        campaign_id=batch_job.campaign_id,
-                        batch_job_id=batch_job_id,
-                        brand_name=post_data.get('brand_name'),
-                        topic=post_data.get('topic'),
-                        tone=post_data.get('tone'),
-                        brief=post_data.get('brief'),
-                        target_audience=post_data.get('target_audience'),
-                        status='processing'
-                    )
-                    self.db.add(post)
-                    self.db.commit()
-                    self.db.refresh(post)
-                    
-                    # Generate caption and image concurrently
-                    print(f"Generating content for post {index + 1}...")
-                    caption_task = openai_service.generate_caption(post_data)
-                    image_task = openai_service.generate_image(post_data)
-                    
-                    # # Wait for both to complete
-                    caption, image_url = await asyncio.gather(caption_task, image_task)
-                    
-                    # # Update post with results in single transaction
-                    post.generated_caption = caption
-                    post.generated_image_url = image_url
-                    # await asyncio.sleep(10)
-
-                    post.status = 'completed'
-                    
-                    # Update batch progress
-                    batch_job.completed_posts += 1
-                    self.db.commit()
-                    
-                    return {
-                        'success': True,
-                        'post_id': str(post.id),
-                        'brand_name': post.brand_name,
-                        'topic': post.topic,
-                        'caption': post.generated_caption,
-                        'image_url': post.generated_image_url
-                    }
-                    
-                except Exception as e:
-                    print(f"Error processing post {index + 1}: {str(e)}")
-                    
-                    # Update failure count
-                    batch_job.failed_posts += 1
-                    self.db.commit()
-                    
-                    return {
-                        'success': False,
-                        'error': str(e),
-                        'brand_name': post_data.get('brand_name', 'Unknown')
-                    }
-        
-        # Execute all posts concurrently with optimized rate limiting
-        print(f"Starting optimized batch generation for {len(posts_data)} posts...")
+
+        return await self.run_posts(batch_job, posts, priority=priority, pack_captions=pack_captions)
+
+    async def run_posts(self, batch_job: BatchJob, posts: List[CampaignPost], priority: str = "normal",
+                        pack_captions: bool = False, finish: bool = True) -> Dict[str, Any]:
+        """Generate content for existing post rows as a two-stage pipeline.
+
+        The caption stage persists each caption as soon as it's ready
+        (status caption_ready) and hands the post to the image stage, which
+        runs on its own queue and concurrency limit. Pass finish=False when
+        more posts of the batch are still to come.
+        """
+        # Concurrency is capped globally by the shared schedulers; each
+        # user/campaign pair is its own flow for fair queuing
+        flow_key = f"{batch_job.created_by}:{batch_job.campaign_id}"
+        batch_id = str(batch_job.id)
+
+        print(f"Starting optimized batch generation for {len(posts)} posts...")
         start_time = datetime.utcnow()
-        
-        # Process posts in batches for better memory management
-        batch_size = 20  # Process 20 posts at a time
-        all_results = []
-        
-        for i in range(0, len(posts_data), batch_size):
-            batch_posts = posts_data[i:i + batch_size]
-            batch_results = await asyncio.gather(
-                *[process_single_post(post_data, i + j) for j, post_data in enumerate(batch_posts)],
-                return_exceptions=True
-            )
-            all_results.extend(batch_results)
-        
+
+        # Optionally caption posts that share brand/tone in packed calls up
+        # front; anything missing from the packs falls back to single calls
+        packed_captions = {}
+        if pack_captions:
+            packed_captions = await self._generate_packed_captions(batch_job, posts, flow_key, priority)
+
+        caption_queue: asyncio.Queue = asyncio.Queue()
+        image_queue: asyncio.Queue = asyncio.Queue()
+        for post in posts:
+            caption_queue.put_nowait(post)
+
+        # Count posts against the process-wide backlog until they finish
+        post_backlog.add(len(posts))
+        released = 0
+
+        def release():
+            nonlocal released
+            released += 1
+            post_backlog.done()
+
+        async def caption_worker():
+            try:
+                while not caption_queue.empty():
+                    # Paused batches hold here; cancelled ones stop claiming posts
+                    await batch_control.wait_if_paused(batch_id)
+                    if batch_control.cancelled(batch_id):
+                        return
+                    try:
+                        post = caption_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        # Other workers woken by the same resume took the rest
+                        return
+
+                    if post.generated_caption:
+                        await image_queue.put(post)
+                        continue
+
+                    while True:
+                        delay = None
+                        async with generation_scheduler.slot(flow_key, priority):
+                            try:
+                                post.status = 'processing'
+                                caption_seconds = None
+                                if post.id in packed_captions:
+                                    # The pack's usage was recorded when it returned
+                                    caption, usage = packed_captions[post.id], {}
+                                else:
+                                    started = time.monotonic()
+                                    caption, usage = await generation_router.generate_caption_with_usage(self._post_data(post))
+                                    caption_seconds = time.monotonic() - started
+
+                                post.generated_caption = caption
+                                post.template_version = template_version(packed=post.id in packed_captions)
+                                post.status = 'caption_ready'
+                                self.usage_service.record(batch_job.created_by, post, usage)
+                                self.stats_service.transition(post.campaign_id, 'pending', 'caption_ready', usage=usage,
+                                                              caption_seconds=caption_seconds)
+                                batch_job.captions_ready += 1
+                                self.db.commit()
+                            except ProviderUnavailable as e:
+                                self._record_spent(batch_job, [post], e)
+                                delay = self._defer_delay(post, e)
+                                if delay is None:
+                                    self._fail_post(batch_job, post, e)
+                            except Exception as e:
+                                self._record_spent(batch_job, [post], e)
+                                self._fail_post(batch_job, post, e)
+                        if delay is None:
+                            break
+                        # Breaker is open - wait it out without holding a slot
+                        await asyncio.sleep(delay)
+
+                    if post.status == 'caption_ready':
+                        await self._check_duplicate(batch_job, post, flow_key, priority)
+                        await image_queue.put(post)
+                    else:
+                        release()
+            except asyncio.CancelledError:
+                # Batch cancelled mid-call - unfinished posts are marked below
+                if not batch_control.cancelled(batch_id):
+                    raise
+
+        async def image_worker():
+            try:
+                while True:
+                    post = await image_queue.get()
+                    if post is None:
+                        return
+                    await batch_control.wait_if_paused(batch_id)
+                    if batch_control.cancelled(batch_id):
+                        release()
+                        continue
+
+                    while True:
+                        delay = None
+                        async with image_scheduler.slot(flow_key, priority):
+                            try:
+                                started = time.monotonic()
+                                image_url, usage = await generation_router.generate_image_with_usage(self._post_data(post))
+
+                                post.generated_image_url = image_url
+                                post.status = 'completed'
+                                # Placeholder images report image_count 0 and cost nothing
+                                image_count = usage.get('image_count', 0)
+                                self.usage_service.record(batch_job.created_by, post, {}, image_count=image_count)
+                                self.stats_service.transition(post.campaign_id, 'caption_ready', 'completed',
+                                                              image_count=image_count,
+                                                              image_seconds=time.monotonic() - started)
+                                batch_job.completed_posts += 1
+                                self.db.commit()
+                            except ProviderUnavailable as e:
+                                delay = self._defer_delay(post, e)
+                                if delay is None:
+                                    self._fail_post(batch_job, post, e)
+                            except Exception as e:
+                                self._fail_post(batch_job, post, e)
+                        if delay is None:
+                            break
+                        await asyncio.sleep(delay)
+
+                    release()
+            except asyncio.CancelledError:
+                # Batch cancelled mid-call - unfinished posts are marked below
+                if not batch_control.cancelled(batch_id):
+                    raise
+
+        # Workers per stage never exceed the global ceilings - the schedulers
+        # decide which batch actually gets each slot
+        caption_workers = [
+            asyncio.create_task(caption_worker())
+            for _ in range(min(generation_scheduler.max_concurrent, len(posts)))
+        ]
+        image_workers = [
+            asyncio.create_task(image_worker())
+            for _ in range(min(image_scheduler.max_concurrent, len(posts)))
+        ]
+
+        # Cancel/pause signals reach the workers through batch_control
+        batch_control.register(batch_id, self._current_status(batch_job))
+        for task in caption_workers + image_workers:
+            batch_control.track(batch_id, task)
+
+        try:
+            try:
+                await asyncio.gather(*caption_workers)
+            finally:
+                # Image workers must always be told to stop, or they wait on the queue forever
+                for _ in image_workers:
+                    image_queue.put_nowait(None)
+            await asyncio.gather(*image_workers)
+            cancelled = batch_control.cancelled(batch_id)
+        finally:
+            # Only reached with live workers when a worker raised
+            for task in caption_workers + image_workers:
+                task.cancel()
+            post_backlog.done(len(posts) - released)
+            batch_control.unregister(batch_id)
+
+        if cancelled:
+            self.cancel_unfinished(batch_job, posts)
+
         end_time = datetime.utcnow()
         processing_time = (end_time - start_time).total_seconds()
-        
+
         # Update final batch status
-        successful_results = [r for r in all_results if isinstance(r, dict) and r.get('success')]
-        batch_job.completed_posts = len(successful_results)
-        batch_job.failed_posts = len(posts_data) - len(successful_results)
-        batch_job.status = "completed" if batch_job.failed_posts == 0 else "completed_with_errors"
-        self.db.commit()
-        
+        successful = [post for post in posts if post.status == 'completed']
+        if finish:
+            self._finish_batch(batch_job)
+
         print(f"Optimized batch completed in {processing_time:.2f} seconds")
-        print(f"Success: {len(successful_results)}/{len(posts_data)} posts")
-        print(f"Average time per post: {processing_time/len(posts_data):.2f} seconds")
-        
+        print(f"Success: {len(successful)}/{len(posts)} posts")
+        print(f"Average time per post: {processing_time/max(len(posts), 1):.2f} seconds")
+
         return {
-            'batch_id': batch_job_id,
-            'total_posts': len(posts_data),
-            'completed_posts': len(successful_results),
-            'failed_posts': batch_job.failed_posts,
+            'batch_id': str(batch_job.id),
+            'total_posts': len(posts),
+            'completed_posts': len(successful),
+            'failed_posts': sum(1 for post in posts if post.status == 'failed'),
+            'cancelled_posts': sum(1 for post in posts if post.status == 'cancelled'),
             'processing_time_seconds': processing_time,
-            'average_time_per_post': processing_time/len(posts_data),
-            'results': all_results
-        }
\ No newline at end of file
+            'average_time_per_post': processing_time/max(len(posts), 1),
+            'results': [self._post_result(post) for post in posts]
+        }
+
+    async def run_pending(self, batch_job: BatchJob, priority: str = "bulk", pack_captions: bool = False,
+                          chunk_size: int = GENERATION_CHUNK_POSTS) -> Dict[str, Any]:
+        """Generate every pending post of a batch, chunk_size posts at a time.
+
+        For imported batches that may be far larger than we want in memory:
+        pages are read by primary key, so each chunk is a cheap index scan.
+        """
+        batch_id = str(batch_job.id)
+        status = self._current_status(batch_job)
+        if status == "pending":
+            batch_job.status = "processing"
+            self.db.commit()
+
+        start_time = datetime.utcnow()
+        completed = failed = 0
+        last_id = ""
+        batch_control.register(batch_id, status)
+        try:
+            while True:
+                # Checked between chunks too, so a cancelled import stops loading posts
+                await batch_control.wait_if_paused(batch_id)
+                if batch_control.cancelled(batch_id):
+                    break
+                posts = (
+                self.db.query(CampaignPost)
+                    .options(selectinload(CampaignPost.content))
+                    .filter(CampaignPost.batch_job_id == batch_id,
+                            CampaignPost.storage_tier == HOT_TIER,
+                            CampaignPost.status == 'pending',
+                            CampaignPost.id > last_id)
+                    .order_by(CampaignPost.id)
+                    .limit(chunk_size)
+                    .all()
+                )
+                if not posts:
+                    break
+                last_id = posts[-1].id
+                result = await self.run_posts(batch_job, posts, priority=priority,
+                                              pack_captions=pack_captions, finish=False)
+                completed += result['completed_posts']
+                failed += result['failed_posts']
+            cancelled = batch_control.cancelled(batch_id)
+        finally:
+            batch_control.unregister(batch_id)
+
+        if cancelled:
+            self.cancel_unfinished(batch_job, [])
+        self._finish_batch(batch_job)
+        return {
+            'batch_id': str(batch_job.id),
+            'total_posts': completed + failed,
+            'completed_posts': completed,
+            'failed_posts': failed,
+            'processing_time_seconds': (datetime.utcnow() - start_time).total_seconds(),
+        }
+
+    async def stream_post(self, batch_job: BatchJob, post: CampaignPost,
+                          priority: str = "interactive") -> AsyncIterator[Tuple[str, Any]]:
+        """Generate a single post, yielding (event, data) as work completes.
+
+        Emits ('token', text) for each caption delta, then ('caption', text),
+        ('image', url), or ('error', message) if a stage fails. Callers must
+        consume promptly: the caption slot is held while tokens are yielded.
+        """
+        flow_key = f"{batch_job.created_by}:{batch_job.campaign_id}"
+        post_data = self._post_data(post)
+        post_backlog.add(1)
+
+        try:
+            async with generation_scheduler.slot(flow_key, priority):
+                post.status = 'processing'
+                usage: Dict = {}
+                parts = []
+                started = time.monotonic()
+                async for delta in generation_router.stream_caption(post_data, usage):
+                    parts.append(delta)
+                    yield 'token', delta
+
+                post.generated_caption = "".join(parts).strip()
+                post.template_version = template_version()
+                post.status = 'caption_ready'
+                self.usage_service.record(batch_job.created_by, post, usage)
+                self.stats_service.transition(post.campaign_id, 'pending', 'caption_ready', usage=usage,
+                                              caption_seconds=time.monotonic() - started)
+                batch_job.captions_ready += 1
+                self.db.commit()
+            # The caption has already been streamed, so it's only flagged
+            await self._check_duplicate(batch_job, post, flow_key, priority, regenerate=False)
+            yield 'caption', post.generated_caption
+
+            async with image_scheduler.slot(flow_key, priority):
+                started = time.monotonic()
+                image_url, usage = await generation_router.generate_image_with_usage(post_data)
+                post.generated_image_url = image_url
+                post.status = 'completed'
+                image_count = usage.get('image_count', 0)
+                self.usage_service.record(batch_job.created_by, post, {}, image_count=image_count)
+                self.stats_service.transition(post.campaign_id, 'caption_ready', 'completed', image_count=image_count,
+                                              image_seconds=time.monotonic() - started)
+                batch_job.completed_posts += 1
+                self.db.commit()
+            yield 'image', image_url
+        except Exception as e:
+            self._record_spent(batch_job, [post], e)
+            self._fail_post(batch_job, post, e)
+            yield 'error', str(e)
+        finally:
+            post_backlog.done()
+            self._finish_batch(batch_job)
+
+    async def retry_failed(self, batch_job: BatchJob, posts: List[CampaignPost],
+                           priority: str = "normal") -> Dict[str, Any]:
+        """Regenerate a finished batch's failed posts, keeping what already succeeded.
+
+        Posts whose caption was stored before the image failed go back to
+        caption_ready, so only their image is generated again. The caller
+        has already moved the batch out of completed_with_errors; if the
+        run dies, unfinished posts are failed again so the batch returns
+        to completed_with_errors and can be retried later.
+        """
+        moved: Dict[str, int] = {}
+        for post in posts:
+            post.status = 'caption_ready' if post.generated_caption else 'pending'
+            post.error_message = None
+            moved[post.status] = moved.get(post.status, 0) + 1
+        for status, count in moved.items():
+            self.stats_service.transition(batch_job.campaign_id, 'failed', status, count=count)
+        batch_job.failed_posts -= len(posts)
+        self.db.commit()
+
+        try:
+            return await self.run_posts(batch_job, posts, priority=priority)
+        except BaseException as e:
+            self.db.rollback()
+            error = RuntimeError(f"Retry interrupted: {str(e) or type(e).__name__}")
+            for post in posts:
+                if post.status not in ('completed', 'failed', 'cancelled'):
+                    self._fail_post(batch_job, post, error)
+            self._finish_batch(batch_job)
+            raise
+
+    def batch_result(self, batch_job: BatchJob) -> Dict[str, Any]:
+        """The process_batch result of a finished batch, rebuilt from its stored posts"""
+        posts = (
+            self.db.query(CampaignPost)
+            .options(selectinload(CampaignPost.content))
+            .filter(CampaignPost.batch_job_id == str(batch_job.id))
+            .order_by(CampaignPost.created_at, CampaignPost.id)
+            .all()
+        )
+        processing_time = (batch_job.updated_at - batch_job.created_at).total_seconds()
+        return {
+            'batch_id': str(batch_job.id),
+            'total_posts': len(posts),
+            'completed_posts': sum(1 for post in posts if post.status == 'completed'),
+            'failed_posts': sum(1 for post in posts if post.status == 'failed'),
+            'cancelled_posts': sum(1 for post in posts if post.status == 'cancelled'),
+            'processing_time_seconds': processing_time,
+            'average_time_per_post': processing_time/max(len(posts), 1),
+            'results': [self._post_result(post) for post in posts]
+        }
+
+    def _finish_batch(self, batch_job: BatchJob):
+        if batch_job.cancelled_posts:
+            batch_job.status = "cancelled"
+        else:
+            batch_job.status = "completed" if batch_job.failed_posts == 0 else "completed_with_errors"
+        # New content - cached campaign responses are stale
+        bump_campaign_version(self.db, batch_job.campaign_id)
+        self.db.commit()
+
+    def _current_status(self, batch_job: BatchJob) -> str:
+        # Our copy of the job isn't refreshed after commits; the endpoints
+        # may have paused or cancelled it since
+        return self.db.query(BatchJob.status).filter(BatchJob.id == batch_job.id).scalar()
+
+    def cancel_unfinished(self, batch_job: BatchJob, posts: List[CampaignPost]):
+        """Mark every post of a cancelled batch that isn't completed or failed as cancelled"""
+        moved: Dict[str, int] = {}
+        for post in posts:
+            if post.status in UNFINISHED_STATUSES:
+                moved[post.status] = moved.get(post.status, 0) + 1
+                post.status = 'cancelled'
+                post.error_message = 'Cancelled'
+        self.db.flush()
+
+        # Rows of the batch this run never loaded, e.g. later import chunks
+        unfinished = self.db.query(CampaignPost).filter(
+            CampaignPost.batch_job_id == str(batch_job.id),
+            # Only finished posts are ever archived
+            CampaignPost.storage_tier == HOT_TIER,
+            CampaignPost.status.in_(UNFINISHED_STATUSES)
+        )
+        for status, count in unfinished.with_entities(CampaignPost.status, func.count(CampaignPost.id)) \
+                .group_by(CampaignPost.status):
+            moved[status] = moved.get(status, 0) + count
+        unfinished.update({CampaignPost.status: 'cancelled', CampaignPost.error_message: 'Cancelled'},
+                          synchronize_session=False)
+
+        for status, count in moved.items():
+            self.stats_service.transition(batch_job.campaign_id, status, 'cancelled', count=count)
+        batch_job.cancelled_posts = (batch_job.cancelled_posts or 0) + sum(moved.values())
+        self.db.commit()
+        print(f"Batch {batch_job.id} cancelled, {sum(moved.values())} unfinished posts marked cancelled")
+
+    async def _check_duplicate(self, batch_job: BatchJob, post: CampaignPost, flow_key: str, priority: str,
+                               regenerate: bool = True):
+        """Index a new caption and flag (or regenerate) it if it nearly repeats an earlier post"""
+        if NEAR_DUPLICATE_ACTION == 'off':
+            return
+        try:
+            sig = signature(post.generated_caption)
+            match = self.duplicate_index.find(post.campaign_id, post.id, sig)
+
+            retries = NEAR_DUPLICATE_MAX_RETRIES if regenerate and NEAR_DUPLICATE_ACTION == 'regenerate' else 0
+            seen = [post.generated_caption]
+            while match is not None and retries > 0:
+                retries -= 1
+                async with generation_scheduler.slot(flow_key, priority):
+                    caption, usage = await generation_router.generate_caption_with_usage(
+                        distinct_caption_request(self._post_data(post), seen)
+                    )
+                seen.append(caption)
+                post.generated_caption = caption
+                self.usage_service.record(batch_job.created_by, post, usage)
+                self.stats_service.transition(post.campaign_id, 'caption_ready', 'caption_ready', usage=usage)
+                sig = signature(caption)
+                match = self.duplicate_index.find(post.campaign_id, post.id, sig)
+
+            if match is not None:
+                print(f"Post {post.id} caption is a near-duplicate of post {match[0]} ({match[1]:.0%} similar)")
+            duplicate_of = match[0] if match is not None else None
+            if duplicate_of != post.duplicate_of:
+                post.duplicate_of = duplicate_of
+                # Listings filter on the flag - make their ETag change too
+                self.stats_service.touch(post.campaign_id)
+            self.duplicate_index.add(post.campaign_id, post.id, sig)
+            self.db.commit()
+        except Exception as e:
+            # Never fail a post over the duplicate check; the caption is already saved
+            self.db.rollback()
+            print(f"Near-duplicate check failed for post {post.id}: {str(e)}")
+            self._record_spent(batch_job, [post], e)
+            self.db.commit()
+
+    def _record_spent(self, batch_job: BatchJob, posts: List[CampaignPost], error: Exception):
+        """Record tokens a failed call was billed for, split over the posts it was for.
+
+        Without this, budgets would only see what successful calls cost.
+        Does not commit - the caller commits with its own update.
+        """
+        usage = getattr(error, 'usage', None)
+        if not usage or not posts:
+            return
+        for post, share in zip(posts, split_usage(usage, len(posts))):
+            self._record_usage(batch_job, post, share)
+
+    def _record_usage(self, batch_job: BatchJob, post: CampaignPost, usage: Dict):
+        """Charge usage to a post without changing its status; does not commit"""
+        self.usage_service.record(batch_job.created_by, post, usage)
+        # Same status on both sides: only the usage totals move
+        self.stats_service.transition(post.campaign_id, post.status, post.status, usage=usage)
+
+    def _defer_delay(self, post: CampaignPost, error: ProviderUnavailable):
+        """Seconds to wait before retrying a post refused by every provider, or None to give up"""
+        now = time.monotonic()
+        since = self._deferred_since.setdefault(post.id, now)
+        if now - since >= BREAKER_MAX_WAIT_SECONDS:
+            return None
+        retry_after = getattr(error, 'retry_after', 1.0) or 1.0
+        return min(retry_after, BREAKER_MAX_WAIT_SECONDS - (now - since))
+
+    def _fail_post(self, batch_job: BatchJob, post: CampaignPost, error: Exception):
+        print(f"Error processing post {post.id}: {str(error)}")
+
+        # Posts fail in the image stage once their caption is stored
+        stage = 'image' if post.status == 'caption_ready' else 'caption'
+        self.stats_service.transition(post.campaign_id, post.status, 'failed')
+        post.status = 'failed'
+        post.error_message = f"{stage}: {str(error)}"
+        batch_job.failed_posts += 1
+        self.db.commit()
+
+    @staticmethod
+    def _post_data(post: CampaignPost) -> Dict:
+        return {
+            'brand_name': post.brand_name,
+            'topic': post.topic,
+            'tone': post.tone,
+            'brief': post.brief,
+            'target_audience': post.target_audience,
+        }
+
+    @staticmethod
+    def _post_result(post: CampaignPost) -> Dict:
+        if post.status != 'completed':
+            return {
+                'success': False,
+                'post_id': str(post.id),
+                'error': post.error_message,
+                'brand_name': post.brand_name or 'Unknown'
+            }
+        return {
+            'success': True,
+            'post_id': str(post.id),
+            'brand_name': post.brand_name,
+            'topic': post.topic,
+            'caption': post.generated_caption,
+            'image_url': post.generated_image_url
+        }
+
+    async def _generate_packed_captions(self, batch_job: BatchJob, posts: List[CampaignPost], flow_key: str,
+                                        priority: str) -> Dict[str, str]:
+        """Caption posts sharing brand/tone in packed calls, keyed by post id.
+
+        Each pack's usage is recorded as soon as it returns, so posts that
+        are cancelled or fail before a caption worker reaches them are still
+        charged for it.
+        """
+        groups: Dict[Tuple, List[CampaignPost]] = {}
+        for post in posts:
+            if post.generated_caption:
+                continue
+            groups.setdefault((post.brand_name, post.tone), []).append(post)
+
+        # Single leftovers gain nothing from packing
+        chunks = [
+            group[i:i + CAPTION_PACK_SIZE]
+            for group in groups.values()
+            for i in range(0, len(group), CAPTION_PACK_SIZE)
+        ]
+        chunks = [chunk for chunk in chunks if len(chunk) > 1]
+
+        async def caption_chunk(chunk: List[CampaignPost]) -> Dict[str, str]:
+            try:
+                async with generation_scheduler.slot(flow_key, priority):
+                    results = await generation_router.generate_captions_packed([self._post_data(post) for post in chunk])
+            except Exception as e:
+                print(f"Packed caption request failed, falling back to single posts: {str(e)}")
+                self._record_spent(batch_job, chunk, e)
+                self.db.commit()
+                return {}
+            captions = {}
+            for post, result in zip(chunk, results):
+                if result is not None:
+                    caption, usage = result
+                    self._record_usage(batch_job, post, usage)
+                    captions[post.id] = caption
+            self.db.commit()
+            return captions
+
+        packed = {}
+        for chunk_result in await asyncio.gather(*[caption_chunk(chunk) for chunk in chunks]):
+            packed.update(chunk_result)
+
+        print(f"Packed captions: {len(packed)}/{len(posts)} posts in {len(chunks)} requests")
+        return packed
@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.campaign_post import CampaignPost
+from models.campaign_stats import CampaignStats
+from services.usage_service import estimate_cost
+
+# Post status -> counter column; processing is never committed on its own
+STATUS_COLUMNS = {
+    'pending': 'pending_posts',
+    'processing': 'pending_posts',
+    'caption_ready': 'caption_ready_posts',
+    'completed': 'completed_posts',
+    'failed': 'failed_posts',
+    'cancelled': 'cancelled_posts',
+}
+
+_COUNTERS = (
+    'pending_posts', 'caption_ready_posts', 'completed_posts', 'failed_posts', 'cancelled_posts',
+    'caption_seconds', 'caption_samples', 'image_seconds', 'image_samples',
+    'prompt_tokens', 'completion_tokens', 'image_count', 'cost_usd',
+)
+
+class CampaignStatsService:
+    """Keeps the campaign_stats rollup in step with post status changes.
+
+    None of the methods commit - callers commit together with the post
+    update so the rollup never drifts from the rows it summarises.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_posts(self, campaign_id: str, count: int):
+        if count:
+            self._increment(campaign_id, {'pending_posts': count})
+
+    def transition(self, campaign_id: str, old_status: Optional[str], new_status: str,
+                   usage: Optional[Dict] = None, image_count: int = 0,
+                   caption_seconds: Optional[float] = None, image_seconds: Optional[float] = None,
+                   count: int = 1):
+        """Move posts between status counters and add what their step used"""
+        deltas: Dict[str, float] = {}
+        old_column, new_column = STATUS_COLUMNS.get(old_status), STATUS_COLUMNS[new_status]
+        if old_column != new_column:
+            if old_column:
+                deltas[old_column] = -count
+            deltas[new_column] = count
+
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        if prompt_tokens or completion_tokens or image_count:
+            deltas.update(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                image_count=image_count,
+                cost_usd=estimate_cost(prompt_tokens, completion_tokens, image_count),
+            )
+        if caption_seconds is not None:
+            deltas.update(caption_seconds=caption_seconds, caption_samples=1)
+        if image_seconds is not None:
+            deltas.update(image_seconds=image_seconds, image_samples=1)
+
+        if deltas:
+            self._increment(campaign_id, deltas)
+
+    def touch(self, campaign_id: str):
+        """Record a post write that moves no counter (e.g. a duplicate flag)"""
+        self._increment(campaign_id, {})
+
+    def get(self, campaign_id: str) -> CampaignStats:
+        """Rollup row for a campaign, built once from campaign_posts if missing.
+
+        Migration 0012 backfills every campaign that had posts before the
+        rollup existed; this covers anything created outside migrations.
+        From then on the row is only incremented.
+        """
+        stats = self.db.query(CampaignStats).filter(CampaignStats.campaign_id == campaign_id).first()
+        if stats is None:
+            stats = self.rebuild(campaign_id)
+            self.db.commit()
+        return stats
+
+    def rebuild(self, campaign_id: str) -> CampaignStats:
+        """Recompute a campaign's rollup with one aggregate scan (latency history is lost)"""
+        columns = [
+            func.coalesce(func.sum(case((CampaignPost.status.in_(statuses), 1), else_=0)), 0)
+            for statuses in (('pending', 'processing'), ('caption_ready',), ('completed',), ('failed',), ('cancelled',))
+        ]
+        row = self.db.query(
+            *columns,
+            func.coalesce(func.sum(CampaignPost.prompt_tokens), 0),
+            func.coalesce(func.sum(CampaignPost.completion_tokens), 0),
+            func.coalesce(func.sum(CampaignPost.image_count), 0),
+            func.coalesce(func.sum(CampaignPost.cost_usd), 0.0),
+        ).filter(CampaignPost.campaign_id == campaign_id).one()
+
+        stats = self.db.query(CampaignStats).filter(CampaignStats.campaign_id == campaign_id).first()
+        if stats is None:
+            stats = CampaignStats(campaign_id=campaign_id)
+            self.db.add(stats)
+        (stats.pending_posts, stats.caption_ready_posts, stats.completed_posts, stats.failed_posts,
+         stats.cancelled_posts, stats.prompt_tokens, stats.completion_tokens, stats.image_count, stats.cost_usd) = row
+        stats.caption_seconds = stats.image_seconds = 0.0
+        stats.caption_samples = stats.image_samples = 0
+        stats.version = (stats.version or 0) + 1
+        self.db.flush()
+        return stats
+
+    def _increment(self, campaign_id: str, deltas: Dict[str, float]):
+        # Every call is a post write, so it also bumps the version
+        if self.db.bind.dialect.name == "postgresql":
+            # Single atomic upsert, safe across workers
+            values = {column: 0 for column in _COUNTERS}
+            values.update(deltas)
+            stmt = pg_insert(CampaignStats).values(campaign_id=campaign_id, version=1, updated_at=datetime.utcnow(),
+                                                   **values)
+            set_ = {column: getattr(CampaignStats, column) + stmt.excluded[column] for column in deltas}
+            set_['version'] = CampaignStats.version + 1
+            set_['updated_at'] = stmt.excluded.updated_at
+            stmt = stmt.on_conflict_do_update(index_elements=['campaign_id'], set_=set_)
+            self.db.execute(stmt)
+            return
+
+        changes = {getattr(CampaignStats, column): getattr(CampaignStats, column) + delta
+                   for column, delta in deltas.items()}
+        changes[CampaignStats.version] = CampaignStats.version + 1
+        updated = self.db.query(CampaignStats).filter(CampaignStats.campaign_id == campaign_id).update(
+            changes, synchronize_session=False
+        )
+        if not updated:
+            values = {column: 0 for column in _COUNTERS}
+            values.update(deltas)
+            self.db.add(CampaignStats(campaign_id=campaign_id, version=1, **values))
+            # Later increments in this transaction must find the row
+            self.db.flush()
+
+def stats_summary(stats: CampaignStats) -> Dict:
+    finished = stats.completed_posts + stats.failed_posts
+    return {
+        'campaign_id': stats.campaign_id,
+        'total_posts': stats.pending_posts + stats.caption_ready_posts + finished + stats.cancelled_posts,
+        'posts_by_status': {
+            'pending': stats.pending_posts,
+            'caption_ready': stats.caption_ready_posts,
+            'completed': stats.completed_posts,
+            'failed': stats.failed_posts,
+            'cancelled': stats.cancelled_posts,
+        },
+        'success_rate': round(stats.completed_posts / finished, 4) if finished else None,
+        'average_caption_seconds': round(stats.caption_seconds / stats.caption_samples, 3) if stats.caption_samples else None,
+        'average_image_seconds': round(stats.image_seconds / stats.image_samples, 3) if stats.image_samples else None,
+        'prompt_tokens': stats.prompt_tokens,
+        'completion_tokens': stats.completion_tokens,
+        'image_count': stats.image_count,
+        'cost_usd': round(stats.cost_usd, 6),
+        'average_cost_per_completed_post': round(stats.cost_usd / stats.completed_posts, 6) if stats.completed_posts else None,
+        'updated_at': stats.updated_at,
+    }
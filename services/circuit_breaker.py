@@ -0,0 +1,151 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple
+from services.generation_provider import ProviderUnavailable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Time limit for guarded calls in the current context, set by the provider
+# router so a timeout happens inside guard() and counts as a failure
+call_timeout: ContextVar[Optional[float]] = ContextVar("call_timeout", default=None)
+
+class CircuitOpenError(ProviderUnavailable):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker for {name} is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of recent calls.
+
+    Opens when either the error rate or the slow-call rate of the last
+    window_size calls crosses its threshold. After open_seconds a few
+    probe calls are let through (half-open); one good probe closes the
+    breaker again, a bad one re-opens it.
+    """
+
+    def __init__(self, name: str, error_rate_threshold: float = 0.5, slow_call_seconds: float = 20.0,
+                 slow_rate_threshold: float = 0.8, window_size: int = 20, min_calls: int = 10,
+                 open_seconds: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright"""
+        return self.state == OPEN and self.retry_after() > 0
+
+    def allow(self):
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.name, self.retry_after())
+            self.state = HALF_OPEN
+            self._half_open_calls = 0
+
+        if self.state == HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name, 1.0)
+            self._half_open_calls += 1
+
+    def record(self, success: bool, seconds: float):
+        slow = seconds >= self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self._half_open_calls -= 1
+            if success and not slow:
+                self._close()
+            else:
+                self._open()
+            return
+
+        self._window.append((success, slow))
+        if len(self._window) < self.min_calls:
+            return
+        errors = sum(1 for ok, _ in self._window if not ok)
+        slow_calls = sum(1 for _, is_slow in self._window if is_slow)
+        if (errors / len(self._window) >= self.error_rate_threshold
+                or slow_calls / len(self._window) >= self.slow_rate_threshold):
+            self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            print(f"Circuit breaker {self.name} opened")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+
+    def _close(self):
+        print(f"Circuit breaker {self.name} closed")
+        self.state = CLOSED
+        self._window.clear()
+
+    @asynccontextmanager
+    async def guard(self):
+        """Wrap one upstream call: rejects while open and records the outcome.
+
+        The call is limited to call_timeout and raises TimeoutError past it.
+        """
+        self.allow()
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(call_timeout.get()):
+                yield
+        except BaseException as e:
+            seconds = time.monotonic() - start
+            if isinstance(e, Exception):
+                self.record(False, seconds)
+            elif seconds >= self.slow_call_seconds:
+                # Cancelled by the caller after running long - still a slow call
+                self.record(True, seconds)
+            elif self.state == HALF_OPEN:
+                # Cancelled probe - free the slot without judging the endpoint
+                self._half_open_calls -= 1
+            raise
+        else:
+            self.record(True, time.monotonic() - start)
+
+    def snapshot(self) -> Dict:
+        return {
+            'name': self.name,
+            'state': self.state,
+            'retry_after_seconds': round(self.retry_after(), 1),
+            'recent_calls': len(self._window),
+        }
+
+# One breaker per model endpoint, shared by every batch in the process
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str, slow_call_seconds: float = 20.0) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            error_rate_threshold=float(os.getenv("BREAKER_ERROR_RATE", "0.5")),
+            slow_call_seconds=slow_call_seconds,
+            window_size=int(os.getenv("BREAKER_WINDOW_SIZE", "20")),
+            min_calls=int(os.getenv("BREAKER_MIN_CALLS", "10")),
+            open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+        )
+    return breaker
+
+def all_breakers():
+    return list(_breakers.values())
@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import mimetypes
+import os
+import tempfile
+import urllib.request
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import select
+from models.campaign_post import CampaignPost, CONTENT_FIELDS
+from models.campaign_post_content import CampaignPostContent
+from database import SessionLocal
+
+EXPORT_FORMATS = ("csv", "jsonl", "zip")
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", "1000"))
+
+# Bytes collected before a chunk is sent to the client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+IMAGE_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+
+# Larger images are left out of the archive rather than buffered
+IMAGE_DOWNLOAD_MAX_BYTES = int(os.getenv("IMAGE_DOWNLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+EXPORT_COLUMNS = (
+    'id', 'batch_job_id', 'campaign_id', 'brand_name', 'topic', 'tone', 'brief', 'target_audience',
+    'generated_caption', 'generated_image_url', 'status', 'error_message', 'prompt_tokens',
+    'completion_tokens', 'image_count', 'cost_usd', 'template_version', 'duplicate_of',
+    'created_at', 'updated_at'
+)
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'zip': 'application/zip',
+}
+
+# Archive entry extension by image content type
+IMAGE_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+def iter_posts(campaign_id: str, batch_job_id: Optional[str] = None,
+               status: Optional[str] = None) -> Iterator[Dict]:
+    """Yield posts as plain dicts in one pass over a server-side cursor.
+
+    Uses its own session since the response outlives the request scope.
+    Plain column rows skip the identity map, so nothing accumulates.
+    """
+    session = SessionLocal()
+    try:
+        table, contents = CampaignPost.__table__, CampaignPostContent.__table__
+        stmt = select(
+            *[(contents if column in CONTENT_FIELDS else table).c[column] for column in EXPORT_COLUMNS]
+        ).select_from(
+            table.outerjoin(contents, contents.c.post_id == table.c.id)
+        ).where(
+            table.c.campaign_id == campaign_id
+        )
+        if batch_job_id:
+            stmt = stmt.where(table.c.batch_job_id == batch_job_id)
+        if status:
+            stmt = stmt.where(table.c.status == status)
+        stmt = stmt.order_by(table.c.created_at, table.c.id)
+
+        # yield_per streams results (named cursor on PostgreSQL) instead of
+        # loading the whole result set client-side
+        result = session.execute(stmt.execution_options(yield_per=EXPORT_FETCH_ROWS))
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        session.close()
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+class _ChunkWriter:
+    """Write-only file object that hands bytes back to the streaming generator.
+
+    Has no seek/tell, so zipfile writes data descriptors instead of going
+    back to patch local headers - the archive can go out as it's built.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def ready(self) -> bool:
+        return self._size >= EXPORT_CHUNK_BYTES
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        self._size = 0
+        return data
+
+def stream_csv(posts: Iterator[Dict]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for post in posts:
+        writer.writerow([_jsonable(post[column]) for column in EXPORT_COLUMNS])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def stream_jsonl(posts: Iterator[Dict]) -> Iterator[bytes]:
+    parts, size = [], 0
+    for post in posts:
+        line = json.dumps({key: _jsonable(value) for key, value in post.items()}) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    yield "".join(parts).encode()
+
+def stream_zip(posts: Iterator[Dict]) -> Iterator[bytes]:
+    """ZIP with images/<post id>.<ext> for every generated image plus posts.jsonl.
+
+    Each image is downloaded in full before its entry is opened, then copied
+    into the archive chunk by chunk. The manifest grows in a spooled temp
+    file (on disk past a few MB) and goes in last, so it can say which
+    images made it.
+    """
+    out = _ChunkWriter()
+    manifest = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    try:
+        with zipfile.ZipFile(out, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for post in posts:
+                record = {key: _jsonable(value) for key, value in post.items()}
+                record['image_file'] = None
+                if post['generated_image_url']:
+                    try:
+                        image, extension = _download_image(post['generated_image_url'])
+                    except Exception as e:
+                        # Expired, unreachable or cut-off download - the post is still exported
+                        print(f"Export skipped image for post {post['id']}: {str(e)}")
+                        record['image_error'] = str(e)
+                    else:
+                        name = f"images/{post['id']}{extension}"
+                        with image:
+                            for _ in _copy_image(image, archive, name):
+                                if out.ready():
+                                    yield out.take()
+                        record['image_file'] = name
+                manifest.write((json.dumps(record) + "\n").encode())
+                if out.ready():
+                    yield out.take()
+
+            manifest.seek(0)
+            with archive.open("posts.jsonl", mode='w', force_zip64=True) as entry:
+                for chunk in iter(lambda: manifest.read(EXPORT_CHUNK_BYTES), b""):
+                    entry.write(chunk)
+                    if out.ready():
+                        yield out.take()
+        yield out.take()
+    finally:
+        manifest.close()
+
+def _download_image(url: str):
+    """Fetch an image into a spooled temp file; returns (file, extension).
+
+    Raises if the download is cut short or too large, so a failed image never
+    reaches the archive.
+    """
+    if not url.startswith(("http://", "https://")):
+        raise ValueError(f"Not an http(s) image URL: {url}")
+    image = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    try:
+        with urllib.request.urlopen(url, timeout=IMAGE_DOWNLOAD_TIMEOUT_SECONDS) as response:
+            content_type = None
+            if response.headers.get("Content-Type"):
+                content_type = response.headers.get_content_type()
+            expected = response.headers.get("Content-Length")
+            size = 0
+            for chunk in iter(lambda: response.read(EXPORT_CHUNK_BYTES), b""):
+                size += len(chunk)
+                if size > IMAGE_DOWNLOAD_MAX_BYTES:
+                    raise ValueError(f"Image larger than {IMAGE_DOWNLOAD_MAX_BYTES} bytes")
+                image.write(chunk)
+        if expected is not None and expected.isdigit() and size != int(expected):
+            raise ValueError(f"Incomplete image download: {size} of {expected} bytes")
+        extension = (IMAGE_EXTENSIONS.get(content_type)
+                     or mimetypes.guess_extension(content_type or "") or ".bin")
+        image.seek(0)
+        return image, extension
+    except BaseException:
+        image.close()
+        raise
+
+def _copy_image(image, archive: zipfile.ZipFile, name: str) -> Iterator[None]:
+    # Images are already compressed - store them as-is
+    info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    with archive.open(info, mode='w', force_zip64=True) as entry:
+        for chunk in iter(lambda: image.read(EXPORT_CHUNK_BYTES), b""):
+            entry.write(chunk)
+            yield
+
+def export_posts(fmt: str, campaign_id: str, batch_job_id: Optional[str] = None,
+                 status: Optional[str] = None) -> Iterator[bytes]:
+    posts = iter_posts(campaign_id, batch_job_id, status)
+    if fmt == 'csv':
+        return stream_csv(posts)
+    if fmt == 'jsonl':
+        return stream_jsonl(posts)
+    return stream_zip(posts)
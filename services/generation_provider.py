@@ -0,0 +1,125 @@
+import hashlib
+import os
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from services.prompt_templates import tone_registry
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider refuses a call up front (e.g. open circuit breaker)"""
+    pass
+
+class GenerationError(Exception):
+    """A provider call that failed, as opposed to a bug in our own code.
+
+    usage holds whatever the provider had already billed for it (empty if
+    nothing), so it can still be recorded. Errors passed on by the router
+    may carry a usage attribute too.
+    """
+
+    def __init__(self, message: str, usage: Optional[Dict] = None):
+        super().__init__(message)
+        self.usage = usage or {}
+
+def add_usage(total: Dict, usage: Optional[Dict]) -> Dict:
+    """Sum token counts into total (in place) and return it"""
+    for key, value in (usage or {}).items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+def split_usage(usage: Dict, parts: int) -> List[Dict]:
+    """Split token counts into parts that add up to the total exactly"""
+    shares = [{} for _ in range(parts)]
+    for key, value in usage.items():
+        share, remainder = divmod(value, parts)
+        for i, part in enumerate(shares):
+            part[key] = share + (1 if i < remainder else 0)
+    return shares
+
+class GenerationProvider:
+    """Interface every caption/image backend implements.
+
+    The cost attributes are rough USD per post and only used to order
+    providers under the cost routing policy. Fallback-only providers are
+    never ranked by a policy; they're tried after all the others.
+    """
+    name = "base"
+    caption_cost = 0.0
+    image_cost = 0.0
+    fallback_only = False
+
+    def is_available(self, kind: str) -> bool:
+        """Whether calls of this kind ('caption' or 'image') would be accepted right now"""
+        return True
+
+    def retry_after(self, kind: str) -> float:
+        """Seconds until an unavailable provider expects to accept calls again"""
+        return 0.0
+
+    async def generate_caption(self, campaign_data: Dict) -> str:
+        caption, _ = await self.generate_caption_with_usage(campaign_data)
+        return caption
+
+    async def generate_caption_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        raise NotImplementedError
+
+    async def stream_caption(self, campaign_data: Dict, usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Providers without native streaming yield the whole caption at once"""
+        caption, caption_usage = await self.generate_caption_with_usage(campaign_data)
+        if usage is not None:
+            usage.update(caption_usage)
+        yield caption
+
+    async def generate_captions_packed(self, posts: List[Dict]) -> List[Optional[Tuple[str, Dict]]]:
+        """Providers without packing support leave every post to single calls"""
+        return [None] * len(posts)
+
+    async def generate_image(self, campaign_data: Dict) -> str:
+        raise NotImplementedError
+
+    async def generate_image_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        """Image URL plus what it cost ({'image_count': n})"""
+        return await self.generate_image(campaign_data), {'image_count': 1}
+
+class LocalProvider(GenerationProvider):
+    """Deterministic template captions and placeholder images.
+
+    Needs no network access - used for tests and as a degraded mode when
+    the upstream API is slow or down. Its output is placeholder content,
+    so it's only a last resort and nothing it returns is billed.
+    """
+    name = "local"
+    fallback_only = True
+
+    def __init__(self, placeholder_url: Optional[str] = None):
+        self.placeholder_url = placeholder_url or os.getenv(
+            "LOCAL_PLACEHOLDER_IMAGE_URL", "https://placehold.co/1024x1024?text={text}"
+        )
+
+    async def generate_caption_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        brand = campaign_data['brand_name']
+        topic = campaign_data.get('topic') or 'General'
+        brief = (campaign_data.get('brief') or '').strip()
+        tone = tone_registry.get(campaign_data['tone'])
+        tone_name = tone['name'] if tone else campaign_data['tone']
+
+        hashtags = []
+        for word in [brand, topic, tone_name, "instagood", "newpost"]:
+            tag = "#" + re.sub(r"[^0-9A-Za-z]", "", word.title())
+            if len(tag) > 1 and tag not in hashtags:
+                hashtags.append(tag)
+
+        lines = [f"✨ {brand}: {topic} ✨"]
+        if brief:
+            lines.append(brief)
+        lines.append(f"Follow {brand} for more! 👉")
+        lines.append(" ".join(hashtags))
+        return "\n\n".join(lines), {'prompt_tokens': 0, 'completion_tokens': 0}
+
+    async def generate_image(self, campaign_data: Dict) -> str:
+        text = f"{campaign_data['brand_name']} {campaign_data.get('topic') or ''}".strip()
+        digest = hashlib.sha1(repr(sorted(campaign_data.items())).encode()).hexdigest()[:12]
+        return self.placeholder_url.format(text=quote(text)) + f"#{digest}"
+
+    async def generate_image_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        return await self.generate_image(campaign_data), {'image_count': 0}
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Expired keys are purged in one DELETE at most this often per process
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+
+MAX_KEY_LENGTH = 255
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+    pass
+
+def fingerprint(*parts: Any) -> str:
+    """sha256 over the request's canonical JSON, so formatting differences don't matter"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+_last_purge = 0.0
+
+class IdempotencyService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def lookup(self, username: str, key: str, request_fingerprint: str) -> Optional[IdempotencyKey]:
+        """Live record for the key, or None. Raises IdempotencyConflict on a different request."""
+        record = self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.username == username,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.utcnow()
+        ).first()
+        if record is not None and record.fingerprint != request_fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        return record
+
+    def claim(self, username: str, key: str, request_fingerprint: str, batch_job_id: str) -> bool:
+        """Store the key for a new batch (caller commits). False if another request won the race."""
+        self.purge_expired()
+        # An expired row that hasn't been purged yet still holds the primary key
+        self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.username == username,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        try:
+            with self.db.begin_nested():
+                self.db.add(IdempotencyKey(
+                    username=username,
+                    key=key,
+                    fingerprint=request_fingerprint,
+                    batch_job_id=batch_job_id,
+                    created_at=now,
+                    expires_at=now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+                ))
+        except IntegrityError:
+            return False
+        return True
+
+    def purge_expired(self, force: bool = False) -> int:
+        """Delete every expired key in one statement (throttled unless forced)"""
+        global _last_purge
+        now = time.monotonic()
+        if not force and now - _last_purge < IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+            return 0
+        _last_purge = now
+        deleted = self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        if deleted:
+            print(f"Purged {deleted} expired idempotency keys")
+        return deleted
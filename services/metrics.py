@@ -0,0 +1,38 @@
+import numpy as np
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from 50ms to ~10 minutes.
+
+    Cheap enough to update on every call; quantiles are read from the
+    cumulative bucket counts.
+    """
+
+    def __init__(self, name: str, min_seconds: float = 0.05, max_seconds: float = 600.0, buckets: int = 48):
+        self.name = name
+        self.bounds = np.geomspace(min_seconds, max_seconds, buckets)
+        # One overflow bucket past the last bound
+        self.counts = np.zeros(buckets + 1, dtype=np.int64)
+        self.total = 0
+
+    def observe(self, seconds: float):
+        self.counts[np.searchsorted(self.bounds, seconds)] += 1
+        self.total += 1
+
+    def quantile(self, q: float, default: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile, or default with no samples"""
+        if self.total == 0:
+            return default
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.total))
+        return float(self.bounds[min(index, len(self.bounds) - 1)])
+
+    def snapshot(self) -> dict:
+        return {
+            'name': self.name,
+            'samples': self.total,
+            'p50_seconds': self.quantile(0.5, 0.0),
+            'p90_seconds': self.quantile(0.9, 0.0),
+        }
+
+# Successful generation calls, fed by the provider router
+caption_latency = LatencyHistogram("caption")
+image_latency = LatencyHistogram("image")
@@ -0,0 +1,106 @@
+import os
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from models.caption_signature import CaptionSignature
+from models.caption_lsh_bucket import CaptionLshBucket
+
+# flag: mark duplicate_of; regenerate: also ask for a different caption; off: skip
+NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "flag").strip().lower()
+
+# Estimated Jaccard similarity of caption shingles that counts as a duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+
+# Extra caption calls per post when regenerating
+NEAR_DUPLICATE_MAX_RETRIES = int(os.getenv("NEAR_DUPLICATE_MAX_RETRIES", "1"))
+
+# 32 bands of 4 rows: pairs above ~0.45 similarity almost always share a bucket
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+SHINGLE_BYTES = 5
+
+# Fixed so signatures stored by any process stay comparable
+_MINHASH_SEED = 20240601
+_PRIME = np.uint64((1 << 31) - 1)
+
+_rng = np.random.default_rng(_MINHASH_SEED)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+_SHINGLE_POWERS = np.uint64(257) ** np.arange(SHINGLE_BYTES - 1, -1, -1, dtype=np.uint64)
+_BAND_MULTIPLIERS = _rng.integers(1, 1 << 62, size=NUM_PERMUTATIONS // LSH_BANDS, dtype=np.uint64) | np.uint64(1)
+_BAND_SALTS = _rng.integers(0, 1 << 62, size=LSH_BANDS, dtype=np.uint64)
+
+def _normalize(text: str) -> bytes:
+    return re.sub(r"\s+", " ", text.lower()).strip().encode("utf-8")
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature over the caption's byte 5-grams, computed without Python loops"""
+    data = np.frombuffer(_normalize(text) or b" ", dtype=np.uint8)
+    if len(data) < SHINGLE_BYTES:
+        data = np.pad(data, (0, SHINGLE_BYTES - len(data)))
+    windows = np.lib.stride_tricks.sliding_window_view(data, SHINGLE_BYTES).astype(np.uint64)
+    shingles = np.unique((windows * _SHINGLE_POWERS).sum(axis=1) % _PRIME)
+    # Every permutation applied to every shingle at once: (permutations, shingles)
+    hashed = (_A[:, None] * shingles[None, :] + _B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+def band_buckets(sig: np.ndarray) -> np.ndarray:
+    """One signed 64-bit bucket key per band (wrapping uint64 arithmetic)"""
+    bands = sig.astype(np.uint64).reshape(LSH_BANDS, -1)
+    with np.errstate(over="ignore"):
+        keys = (bands * _BAND_MULTIPLIERS).sum(axis=1) ^ _BAND_SALTS
+    return keys.view(np.int64)
+
+class NearDuplicateIndex:
+    """Per-campaign LSH index over caption MinHash signatures.
+
+    Signatures and band buckets are stored as captions are generated, so
+    checking a new caption is one indexed bucket lookup plus a vectorized
+    comparison against the few candidates found - never a campaign scan.
+    Nothing here commits; callers commit with the post update.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def find(self, campaign_id: str, post_id: str, sig: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Most similar earlier post above the threshold as (post_id, similarity), or None"""
+        buckets = [int(bucket) for bucket in band_buckets(sig)]
+        candidates = self.db.query(CaptionSignature.post_id, CaptionSignature.signature).filter(
+            CaptionSignature.post_id.in_(
+                self.db.query(CaptionLshBucket.post_id).filter(
+                    CaptionLshBucket.campaign_id == campaign_id,
+                    CaptionLshBucket.bucket.in_(buckets),
+                    CaptionLshBucket.post_id != post_id
+                )
+            )
+        ).all()
+        if not candidates:
+            return None
+
+        signatures = np.frombuffer(b"".join(row.signature for row in candidates), dtype=np.uint32)
+        similarity = (signatures.reshape(len(candidates), NUM_PERMUTATIONS) == sig).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < NEAR_DUPLICATE_THRESHOLD:
+            return None
+        return candidates[best].post_id, round(float(similarity[best]), 3)
+
+    def add(self, campaign_id: str, post_id: str, sig: np.ndarray):
+        """Index a post's caption, replacing whatever was indexed for it before"""
+        self.remove(post_id)
+        self.db.add(CaptionSignature(post_id=post_id, campaign_id=campaign_id, signature=sig.tobytes()))
+        self.db.add_all([
+            CaptionLshBucket(campaign_id=campaign_id, bucket=int(bucket), post_id=post_id)
+            for bucket in set(band_buckets(sig).tolist())
+        ])
+
+    def remove(self, post_id: str):
+        self.db.query(CaptionLshBucket).filter(CaptionLshBucket.post_id == post_id).delete(synchronize_session=False)
+        self.db.query(CaptionSignature).filter(CaptionSignature.post_id == post_id).delete(synchronize_session=False)
+
+def distinct_caption_request(post_data: dict, existing_captions: List[str]) -> dict:
+    """Post data asking the model to avoid captions it has already produced"""
+    avoid = "\n".join(f"- {caption[:300]}" for caption in existing_captions)
+    brief = (post_data.get('brief') or '').strip()
+    return dict(post_data, brief=f"{brief}\nWrite something clearly different from these existing captions:\n{avoid}".strip())
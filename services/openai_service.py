@@ -1,64 +1,209 @@
-import openai
 import asyncio
+import json
+import math
 import os
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from services.prompt_templates import render_caption_prompt, render_image_prompt, render_packed_caption_prompt
+from services.generation_provider import GenerationError, GenerationProvider, ProviderUnavailable, split_usage
+from services.circuit_breaker import get_breaker
+from services import usage_service
 
 # Load environment variables from .env file
 load_dotenv()
 
-class OpenAIService:
+MAX_CAPTION_LENGTH = 2000
+
+CAPTION_MODEL = "gpt-4o-mini"
+IMAGE_MODEL = "dall-e-3"
+
+class OpenAIService(GenerationProvider):
+    name = "openai"
+    caption_cost = usage_service.estimate_cost(
+        usage_service.ESTIMATED_PROMPT_TOKENS_PER_POST,
+        usage_service.ESTIMATED_COMPLETION_TOKENS_PER_POST,
+        0
+    )
+    image_cost = usage_service.IMAGE_COST
+    
     def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._client = None
+        # One breaker per model endpoint, shared by all batches
+        self.caption_breaker = get_breaker(
+            f"openai:{CAPTION_MODEL}",
+            slow_call_seconds=float(os.getenv("BREAKER_SLOW_CAPTION_SECONDS", "15"))
+        )
+        self.image_breaker = get_breaker(
+            f"openai:{IMAGE_MODEL}",
+            slow_call_seconds=float(os.getenv("BREAKER_SLOW_IMAGE_SECONDS", "60"))
+        )
+    
+    @property
+    def client(self):
+        # The SDK is slow to import and the client needs the API key, so
+        # both wait until the first generation call
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
+    def is_available(self, kind: str) -> bool:
+        breaker = self.caption_breaker if kind == "caption" else self.image_breaker
+        return not breaker.is_open()
+    
+    def retry_after(self, kind: str) -> float:
+        breaker = self.caption_breaker if kind == "caption" else self.image_breaker
+        return breaker.retry_after()
+        
+    async def generate_caption_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        """Generate a caption and return it with the token usage reported by the API"""
+        prompt = render_caption_prompt(campaign_data)
+        usage: Dict = {}
         
-    async def generate_caption(self, campaign_data: Dict) -> str:
-        prompt = f"""
-        Create an engaging Instagram caption for:
-        Brand: {campaign_data['brand_name']}
-        Topic: {campaign_data.get('topic', 'General')}
-        Tone: {campaign_data['tone']}
-        Target Audience: {campaign_data.get('target_audience', 'General audience')}
-        Brief: {campaign_data.get('brief', '')}
+        try:
+            async with self.caption_breaker.guard():
+                response = await self.client.chat.completions.create(
+                    model=CAPTION_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=500,
+                    temperature=0.7
+                )
+            # Billed whether or not the content turns out usable
+            usage = _usage(response)
+            caption = (response.choices[0].message.content or "").strip()
+            if not caption:
+                raise ValueError("empty caption")
+            return caption, usage
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            raise GenerationError(f"Caption generation failed: {str(e)}", usage)
+    
+    async def stream_caption(self, campaign_data: Dict, usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Yield caption text deltas as the model produces them.
+
+        If a usage dict is passed it is filled with the token usage once the
+        stream finishes. A stream that fails partway raises GenerationError
+        with the usage reported so far, or an estimate from the prompt and
+        the tokens received if the usage chunk never arrived.
+        """
+        prompt = render_caption_prompt(campaign_data)
+        reported: Dict = {}
+        received = 0
         
-        Requirements:
-        - Match the {campaign_data['tone']} tone
-        - Include 5-8 relevant hashtags
-        - Add appropriate emojis
-        - Keep under 2000 characters
-        - Include call-to-action
+        try:
+            async with self.caption_breaker.guard():
+                stream = await self.client.chat.completions.create(
+                    model=CAPTION_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=500,
+                    temperature=0.7,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        received += 1
+                        yield chunk.choices[0].delta.content
+                    if chunk.usage:
+                        reported = {
+                            'prompt_tokens': chunk.usage.prompt_tokens,
+                            'completion_tokens': chunk.usage.completion_tokens,
+                        }
+                        if usage is not None:
+                            usage.update(reported)
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            if not reported and received:
+                # Each delta is about one token; the prompt was billed once output started
+                reported = {'prompt_tokens': math.ceil(len(prompt) / 4), 'completion_tokens': received}
+            raise GenerationError(f"Caption generation failed: {str(e)}", reported)
+    
+    async def generate_captions_packed(self, posts: List[Dict]) -> List[Optional[Tuple[str, Dict]]]:
+        """Generate captions for several posts sharing brand and tone in one call.
+
+        Returns one entry per post, in order. Entries the model didn't return
+        or that fail validation are None so the caller can fall back to
+        generate_caption_with_usage for just those posts.
         """
+        prompt = render_packed_caption_prompt(posts)
+        usage: Dict = {}
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+            async with self.caption_breaker.guard():
+                response = await self.client.chat.completions.create(
+                    model=CAPTION_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=min(500 * len(posts), 16000),
+                    temperature=0.7,
+                    response_format={"type": "json_object"}
+                )
+            usage = _usage(response)
+            payload = json.loads(response.choices[0].message.content)
+        except ProviderUnavailable:
+            raise
         except Exception as e:
-            raise Exception(f"Caption generation failed: {str(e)}")
+            raise GenerationError(f"Packed caption generation failed: {str(e)}", usage)
+        
+        captions: List[Optional[str]] = [None] * len(posts)
+        items = payload.get('captions') if isinstance(payload, dict) else None
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index = item.get('index')
+            caption = item.get('caption')
+            if (
+                isinstance(index, int) and 0 <= index < len(posts)
+                and isinstance(caption, str) and caption.strip()
+                and len(caption) <= MAX_CAPTION_LENGTH
+            ):
+                captions[index] = caption.strip()
+        
+        # The whole call's usage is split over the captions we keep, so
+        # tokens spent on invalid items are still charged
+        valid = sum(1 for caption in captions if caption is not None)
+        if not valid:
+            raise GenerationError("Packed caption generation returned no usable captions", usage)
+        shares = split_usage(usage, valid)
+        results: List[Optional[Tuple[str, Dict]]] = []
+        for caption in captions:
+            results.append(None if caption is None else (caption, shares.pop(0)))
+        return results
     
     async def generate_image(self, campaign_data: Dict) -> str:
-        image_prompt = f"""
-        Professional Instagram post image for {campaign_data['brand_name']}.
-        Topic: {campaign_data.get('topic', 'Brand content')}
-        Style: {campaign_data['tone']} and appealing
-        Brief: {campaign_data.get('brief', '')}
-        High quality, 1:1 aspect ratio, vibrant colors, no text overlay.
-        """
+        image_prompt = render_image_prompt(campaign_data)
         
         try:
-            response = await self.client.images.generate(
-                model="dall-e-3",
-                prompt=image_prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
+            async with self.image_breaker.guard():
+                response = await self.client.images.generate(
+                    model=IMAGE_MODEL,
+                    prompt=image_prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1,
+                )
             return response.data[0].url
+        except ProviderUnavailable:
+            raise
         except Exception as e:
-            raise Exception(f"Image generation failed: {str(e)}")
+            # Failed image requests aren't billed
+            raise GenerationError(f"Image generation failed: {str(e)}")
+
+def _usage(response) -> Dict:
+    return {
+        'prompt_tokens': response.usage.prompt_tokens if response.usage else 0,
+        'completion_tokens': response.usage.completion_tokens if response.usage else 0,
+    }
 
 # Global instance
 openai_service = OpenAIService()
\ No newline at end of file
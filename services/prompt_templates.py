@@ -0,0 +1,169 @@
+import os
+import string
+import textwrap
+import time
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from models.content_tone import ContentTone
+
+class PromptTemplate:
+    """A versioned prompt, parsed once into literal/field segments.
+
+    Bump the version whenever the wording changes so stored posts (and
+    anything keyed on the prompt) can tell which template produced them.
+    """
+
+    def __init__(self, name: str, version: int, text: str):
+        self.name = name
+        self.version = version
+        self.text = textwrap.dedent(text).strip()
+        self._segments = [
+            (literal, field)
+            for literal, field, _, _ in string.Formatter().parse(self.text)
+        ]
+        self.fields = {field for _, field in self._segments if field}
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field:
+                parts.append(str(values.get(field, "")))
+        return "".join(parts)
+
+CAPTION_TEMPLATE = PromptTemplate("caption", 2, """
+    Write an Instagram caption.
+    Brand: {brand_name}
+    Topic: {topic}
+    Audience: {target_audience}
+    Brief: {brief}
+    Tone: {tone_name}. {tone_modifier}
+    Include 5-8 relevant hashtags, emojis and a call-to-action. Under 2000 characters.
+""")
+
+IMAGE_TEMPLATE = PromptTemplate("image", 2, """
+    Professional Instagram post image for {brand_name}.
+    Topic: {topic}
+    Style: {tone_name}, appealing
+    Brief: {brief}
+    High quality, 1:1 aspect ratio, vibrant colors, no text overlay.
+""")
+
+# Packed mode: brand/tone/requirements are sent once for N posts
+PACKED_CAPTION_TEMPLATE = PromptTemplate("caption-packed", 1, """
+    Write one Instagram caption for each numbered post below.
+    Brand: {brand_name}
+    Tone: {tone_name}. {tone_modifier}
+    Each caption: 5-8 relevant hashtags, emojis and a call-to-action. Under 2000 characters.
+    Reply with JSON only: {{"captions": [{{"index": <post number>, "caption": "<text>"}}]}}
+
+    {items}
+""")
+
+PACKED_ITEM_TEMPLATE = PromptTemplate("caption-packed-item", 1, """
+    {index}. Topic: {topic} | Audience: {target_audience} | Brief: {brief}
+""")
+
+def template_version(packed: bool = False) -> str:
+    """Version string stored on generated posts"""
+    caption_template = PACKED_CAPTION_TEMPLATE if packed else CAPTION_TEMPLATE
+    return f"{caption_template.key},{IMAGE_TEMPLATE.key}"
+
+class ToneRegistry:
+    """In-memory copy of content_tones, refreshed every ttl_seconds or on reload()"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._tones: Dict[str, Dict[str, str]] = {}
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def load(self, db: Session):
+        tones = {
+            tone.id: {
+                'id': tone.id,
+                'name': tone.name,
+                'description': tone.description,
+                'prompt_modifier': tone.prompt_modifier or ""
+            }
+            for tone in db.query(ContentTone).all()
+        }
+        # Swap the whole dict so readers never see a half-loaded registry
+        self._tones = tones
+        self._loaded_at = time.monotonic()
+
+    def reload(self, db: Optional[Session] = None):
+        if db is not None:
+            self.load(db)
+            return
+
+        from database import SessionLocal
+        session = SessionLocal()
+        try:
+            self.load(session)
+        finally:
+            session.close()
+
+    def ensure_loaded(self, db: Optional[Session] = None):
+        """
+        Load on first use and after the TTL expires; keep stale data if the DB is unavailable.
+        Request handlers pass their own session so the refresh doesn't open a second connection.
+        """
+        if self.loaded and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        try:
+            self.reload(db)
+        except Exception as e:
+            print(f"Could not load content tones: {str(e)}")
+            if db is not None:
+                db.rollback()
+            if not self.loaded:
+                self._loaded_at = time.monotonic()
+
+    def get(self, tone_id: str) -> Optional[Dict[str, str]]:
+        return self._tones.get(tone_id)
+
+    def is_known(self, tone_id: str) -> bool:
+        # An empty registry (unseeded database) accepts any tone
+        return not self._tones or tone_id in self._tones
+
+    def all(self) -> List[Dict[str, str]]:
+        return list(self._tones.values())
+
+tone_registry = ToneRegistry(ttl_seconds=int(os.getenv("TONE_REGISTRY_TTL_SECONDS", "300")))
+
+def _template_values(campaign_data: Dict) -> Dict[str, str]:
+    tone_id = campaign_data['tone']
+    tone = tone_registry.get(tone_id)
+    return {
+        'brand_name': campaign_data['brand_name'],
+        'topic': campaign_data.get('topic') or 'General',
+        'target_audience': campaign_data.get('target_audience') or 'General audience',
+        'brief': campaign_data.get('brief') or '',
+        'tone_name': tone['name'] if tone else tone_id,
+        'tone_modifier': tone['prompt_modifier'] if tone else '',
+    }
+
+def render_caption_prompt(campaign_data: Dict) -> str:
+    return CAPTION_TEMPLATE.render(_template_values(campaign_data))
+
+def render_image_prompt(campaign_data: Dict) -> str:
+    return IMAGE_TEMPLATE.render(_template_values(campaign_data))
+
+def render_packed_caption_prompt(posts: List[Dict]) -> str:
+    """Prompt for posts that share brand and tone, numbered from 0"""
+    items = []
+    for index, post in enumerate(posts):
+        values = _template_values(post)
+        values['index'] = index
+        items.append(PACKED_ITEM_TEMPLATE.render(values))
+    values = _template_values(posts[0])
+    values['items'] = "\n".join(items)
+    return PACKED_CAPTION_TEMPLATE.render(values)
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from services.generation_provider import (
+    GenerationError, GenerationProvider, LocalProvider, ProviderUnavailable, add_usage
+)
+from services.circuit_breaker import call_timeout
+from services.openai_service import openai_service
+from services.metrics import caption_latency, image_latency
+
+ROUTING_POLICIES = ("failover", "latency", "cost")
+
+# Per-call time limits; a call that runs over counts as a failure and is retried on the next provider
+CAPTION_TIMEOUT_SECONDS = float(os.getenv("CAPTION_TIMEOUT_SECONDS", "30"))
+IMAGE_TIMEOUT_SECONDS = float(os.getenv("IMAGE_TIMEOUT_SECONDS", "90"))
+
+# Extra time before the router gives up on a provider that doesn't apply
+# call_timeout itself; guarded calls time out (and count as failures) first
+TIMEOUT_GRACE_SECONDS = 1.0
+
+# Weight of the newest sample in the moving latency average
+LATENCY_EWMA_ALPHA = 0.2
+
+class ProviderRouter(GenerationProvider):
+    """Sends each generation call to one of several providers.
+
+    Policies decide the order providers are tried in:
+    - failover: configured order
+    - latency: lowest moving-average latency first
+    - cost: cheapest first
+    Fallback-only providers (local placeholders) always come last. Whatever
+    the policy, a provider that errors, times out or refuses the
+    call (ProviderUnavailable) is skipped for the next one.
+    """
+    name = "router"
+
+    def __init__(self, providers: List[GenerationProvider], policy: str = "failover"):
+        if not providers:
+            raise ValueError("At least one generation provider is required")
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        self.providers = providers
+        self.policy = policy
+        self._latency: Dict[Tuple[str, str], float] = {}
+
+    def _candidates(self, kind: str) -> List[GenerationProvider]:
+        # Placeholder providers would always win on cost and latency - keep
+        # them out of the ranking and only fail over to them at the end
+        ranked = [provider for provider in self.providers if not provider.fallback_only]
+        fallbacks = [provider for provider in self.providers if provider.fallback_only]
+        if self.policy == "latency":
+            # Providers without samples yet sort first so they get measured
+            ranked.sort(key=lambda p: self._latency.get((p.name, kind), 0.0))
+        elif self.policy == "cost":
+            ranked.sort(key=lambda p: p.caption_cost if kind == "caption" else p.image_cost)
+        return ranked + fallbacks
+
+    def _observe(self, provider: GenerationProvider, kind: str, seconds: float, sample: bool = True):
+        # Only single successful calls feed the histograms used for planning
+        if sample:
+            (caption_latency if kind == "caption" else image_latency).observe(seconds)
+        key = (provider.name, kind)
+        previous = self._latency.get(key)
+        self._latency[key] = seconds if previous is None else (
+            LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * previous
+        )
+
+    def is_available(self, kind: str) -> bool:
+        return any(provider.is_available(kind) for provider in self.providers)
+
+    def retry_after(self, kind: str) -> float:
+        return min(provider.retry_after(kind) for provider in self.providers)
+
+    def latency(self, provider_name: str, kind: str) -> Optional[float]:
+        return self._latency.get((provider_name, kind))
+
+    async def _route(self, kind: str, method: str, *args, timeout: float):
+        last_error: Optional[Exception] = None
+        # Tokens billed by providers whose call failed anyway
+        spent: Dict = {}
+        for provider in self._candidates(kind):
+            start = time.monotonic()
+            token = call_timeout.set(timeout)
+            try:
+                result = await asyncio.wait_for(getattr(provider, method)(*args), timeout + TIMEOUT_GRACE_SECONDS)
+            except ProviderUnavailable as e:
+                last_error = e
+                continue
+            except Exception as e:
+                # A failure costs as much as a timeout, so a provider that
+                # errors quickly doesn't look fast to the latency policy
+                self._observe(provider, kind, timeout, sample=False)
+                print(f"Provider {provider.name} failed for {kind}: {str(e) or type(e).__name__}")
+                add_usage(spent, getattr(e, 'usage', None))
+                last_error = e
+                continue
+            finally:
+                call_timeout.reset(token)
+            self._observe(provider, kind, time.monotonic() - start,
+                          sample=method != "generate_captions_packed")
+            return _charge(result, spent) if spent else result
+        if spent:
+            last_error.usage = spent
+        raise last_error
+
+    async def generate_caption_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        return await self._route("caption", "generate_caption_with_usage", campaign_data,
+                                 timeout=CAPTION_TIMEOUT_SECONDS)
+
+    async def generate_captions_packed(self, posts: List[Dict]) -> List[Optional[Tuple[str, Dict]]]:
+        # Packed prompts produce longer outputs - scale the limit with the pack
+        return await self._route("caption", "generate_captions_packed", posts,
+                                 timeout=CAPTION_TIMEOUT_SECONDS * max(1, len(posts) // 2))
+
+    async def generate_image(self, campaign_data: Dict) -> str:
+        return await self._route("image", "generate_image", campaign_data, timeout=IMAGE_TIMEOUT_SECONDS)
+
+    async def generate_image_with_usage(self, campaign_data: Dict) -> Tuple[str, Dict]:
+        return await self._route("image", "generate_image_with_usage", campaign_data, timeout=IMAGE_TIMEOUT_SECONDS)
+
+    async def stream_caption(self, campaign_data: Dict, usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Fail over only before the first token - once text went out we can't switch providers"""
+        last_error: Optional[Exception] = None
+        # Tokens billed by providers whose stream failed before any output
+        spent: Dict = {}
+        for provider in self._candidates("caption"):
+            start = time.monotonic()
+            started = False
+            try:
+                async for delta in provider.stream_caption(campaign_data, usage):
+                    started = True
+                    yield delta
+            except Exception as e:
+                if started:
+                    if spent:
+                        e.usage = add_usage(dict(getattr(e, 'usage', None) or {}), spent)
+                    raise
+                if not isinstance(e, ProviderUnavailable):
+                    self._observe(provider, "caption", CAPTION_TIMEOUT_SECONDS, sample=False)
+                    print(f"Provider {provider.name} failed for caption stream: {str(e)}")
+                    add_usage(spent, getattr(e, 'usage', None))
+                last_error = e
+                continue
+            self._observe(provider, "caption", time.monotonic() - start)
+            if spent and usage is not None:
+                add_usage(usage, spent)
+            return
+        if spent:
+            last_error.usage = spent
+        raise last_error
+
+def _charge(result, spent: Dict):
+    """Add usage of failed attempts to the usage of the result that succeeded"""
+    if isinstance(result, tuple):
+        value, usage = result
+        return value, add_usage(dict(usage), spent)
+    if isinstance(result, list):
+        for i, entry in enumerate(result):
+            if entry is not None:
+                result[i] = _charge(entry, spent)
+                return result
+        # Nothing usable to charge it to - surface it as a failure instead
+        raise GenerationError("No usable packed captions", spent)
+    return result
+
+def _build_router() -> ProviderRouter:
+    available = {provider.name: provider for provider in [openai_service, LocalProvider()]}
+    names = [name.strip() for name in os.getenv("GENERATION_PROVIDERS", "openai").split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown generation providers: {', '.join(unknown)}")
+    return ProviderRouter(
+        [available[name] for name in names],
+        policy=os.getenv("GENERATION_ROUTING_POLICY", "failover")
+    )
+
+# Global instance
+generation_router = _build_router()
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from models.campaign import Campaign
+from services.serialization import dumps
+
+# Rendered bodies kept in memory across all users (LRU by total size)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class ResponseCache:
+    """In-process cache of rendered JSON bodies keyed by request.
+
+    An entry is only reused while its validator (the ETag) still matches
+    what the database says now, so a stale entry can never be served - the
+    explicit invalidation just frees the memory early.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple, Tuple[str, bytes, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, etag: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != etag:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple, etag: str, body: bytes, campaign_id: Optional[str] = None):
+        if len(body) > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (etag, body, campaign_id)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_campaign(self, campaign_id: str):
+        for key in [key for key, entry in self._entries.items() if entry[2] == campaign_id]:
+            self._drop(key)
+
+    def invalidate_user(self, user_id: str):
+        for key in [key for key in self._entries if key[0] == user_id]:
+            self._drop(key)
+
+    def _drop(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def snapshot(self) -> Dict:
+        return {'entries': len(self._entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+# Global instance
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # Naive timestamps are written with datetime.utcnow()
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def latest(*values) -> Optional[datetime]:
+    """Newest of several timestamps, any of which may be None or naive UTC"""
+    values = [_as_utc(value) for value in values if value is not None]
+    return max(values) if values else None
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or etag[2:] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def conditional_response(request: Request, key: Tuple, validator: Tuple, last_modified: Optional[datetime],
+                         render: Callable[[], Any], campaign_id: Optional[str] = None) -> Response:
+    """Answer a GET with 304, a cached body, or a freshly rendered one.
+
+    validator is whatever changes when the response would: versions,
+    counts and newest updated_at of the rows behind it. render is only
+    called on a cache miss.
+    """
+    etag = 'W/"' + hashlib.sha1(repr((key, validator)).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = dumps(render())
+        response_cache.put(key, etag, body, campaign_id)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def bump_campaign_version(db: Session, campaign_id: str):
+    """Mark a campaign's cached responses stale (caller commits).
+
+    campaign_id comes from string columns elsewhere, so anything that
+    isn't a UUID simply has no campaign row to bump.
+    """
+    try:
+        campaign_uuid = uuid.UUID(str(campaign_id))
+    except ValueError:
+        return
+    db.query(Campaign).filter(Campaign.id == campaign_uuid).update(
+        {Campaign.version: Campaign.version + 1}, synchronize_session=False
+    )
+    response_cache.invalidate_campaign(str(campaign_uuid))
@@ -0,0 +1,178 @@
+import asyncio
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+# Priority classes, highest first. A lower class only gets a slot when no
+# higher class has anything waiting.
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+
+# Interactive work is served ahead of everything else, so only requests
+# this small may run in that class
+INTERACTIVE_MAX_POSTS = int(os.getenv("INTERACTIVE_MAX_POSTS", "5"))
+
+def effective_priority(requested: Optional[str], post_count: int) -> str:
+    """Priority class a request runs in, whatever the client asked for.
+
+    Small requests default to interactive and larger ones to normal; a
+    larger request asking for interactive is downgraded to normal.
+    """
+    small = post_count <= INTERACTIVE_MAX_POSTS
+    if requested is None or (requested == "interactive" and not small):
+        return "interactive" if small else "normal"
+    return requested
+
+class _Flow:
+    """Waiters of a single user/campaign flow inside one priority class"""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.deficit = 0.0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+class GenerationScheduler:
+    """Global concurrency ceiling shared by every batch.
+
+    Slots are handed out by strict priority between classes and by deficit
+    round-robin (DRR) between flows of the same class, so one user's large
+    batch can't starve everybody else of OpenAI quota.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._flows: Dict[str, "OrderedDict[str, _Flow]"] = {
+            priority: OrderedDict() for priority in PRIORITY_CLASSES
+        }
+
+    def pending(self) -> int:
+        """Number of callers currently waiting for a slot"""
+        return sum(
+            len(flow.waiters)
+            for flows in self._flows.values()
+            for flow in flows.values()
+        )
+
+    @asynccontextmanager
+    async def slot(self, flow_key: str, priority: str = "normal", weight: float = 1.0):
+        await self.acquire(flow_key, priority, weight)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, flow_key: str, priority: str = "normal", weight: float = 1.0):
+        if priority not in self._flows:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        # Fast path: free capacity and nobody queued ahead of us
+        if self.in_flight < self.max_concurrent and not self.pending():
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        flows = self._flows[priority]
+        flow = flows.get(flow_key)
+        if flow is None:
+            flow = flows[flow_key] = _Flow(weight)
+        flow.waiters.append(future)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we got cancelled - hand it back
+                self.release()
+            else:
+                self._discard(priority, flow_key, future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _discard(self, priority: str, flow_key: str, future: asyncio.Future):
+        flows = self._flows[priority]
+        flow = flows.get(flow_key)
+        if flow is None:
+            return
+        try:
+            flow.waiters.remove(future)
+        except ValueError:
+            pass
+        if not flow.waiters:
+            del flows[flow_key]
+
+    def _dispatch(self):
+        while self.in_flight < self.max_concurrent:
+            future = self._next_waiter()
+            if future is None:
+                return
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _next_waiter(self):
+        for priority in PRIORITY_CLASSES:
+            flows = self._flows[priority]
+            while flows:
+                flow_key, flow = next(iter(flows.items()))
+
+                # Drop waiters that were cancelled while queued
+                while flow.waiters and flow.waiters[0].done():
+                    flow.waiters.popleft()
+                if not flow.waiters:
+                    del flows[flow_key]
+                    continue
+
+                # Start a new DRR round for this flow
+                if flow.deficit < 1:
+                    flow.deficit += flow.weight
+                    if flow.deficit < 1:
+                        flows.move_to_end(flow_key)
+                        continue
+
+                future = flow.waiters.popleft()
+                flow.deficit -= 1
+                if not flow.waiters:
+                    # Idle flows don't bank credit (standard DRR reset)
+                    del flows[flow_key]
+                elif flow.deficit < 1:
+                    flows.move_to_end(flow_key)
+                return future
+        return None
+
+class Backlog:
+    """Posts accepted for generation but not finished yet, across all batches in this process"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.posts = 0
+
+    def saturated(self, incoming: int = 0) -> bool:
+        """True if incoming posts would overfill the backlog.
+
+        An idle process admits any batch, even one larger than the limit -
+        otherwise a retry could never succeed however long the client waits.
+        """
+        return bool(self.limit) and self.posts > 0 and self.posts + incoming > self.limit
+
+    def add(self, count: int):
+        self.posts += count
+
+    def done(self, count: int = 1):
+        self.posts = max(0, self.posts - count)
+
+# Global instances - the ceilings should match the OpenAI rate-limit tier.
+# Captions and images have separate limits so slow image calls never hold
+# back captions.
+generation_scheduler = GenerationScheduler(
+    max_concurrent=int(os.getenv("OPENAI_MAX_CONCURRENCY", "10"))
+)
+image_scheduler = GenerationScheduler(
+    max_concurrent=int(os.getenv("IMAGE_MAX_CONCURRENCY", "5"))
+)
+
+# Beyond this many unfinished posts new work is shed with 503 (0 = unlimited);
+# a batch arriving while nothing is queued is always admitted
+post_backlog = Backlog(limit=int(os.getenv("MAX_QUEUED_POSTS", "1000")))
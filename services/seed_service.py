@@ -0,0 +1,102 @@
+import json
+import os
+from typing import Dict, Iterable, List
+from sqlalchemy import Table
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from database import Base
+# Imported so fixture tables are registered on Base.metadata
+from models.content_tone import ContentTone
+from models.user import User
+
+# fixtures/<table name>.json holds a list of rows for that table
+FIXTURES_DIR = os.getenv("FIXTURES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures"))
+
+# Rows per INSERT statement
+SEED_CHUNK_ROWS = 1000
+
+_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+class SeedService:
+    """Loads reference data with upserts, so seeding can run on every deploy.
+
+    Rows are matched on primary key: existing ones are updated to the
+    fixture's values (or left alone with update=False), missing ones are
+    inserted. Nothing is ever deleted. None of the methods commit.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def upsert_rows(self, table: Table, rows: Iterable[Dict], update: bool = True) -> int:
+        """Insert-or-update rows in chunks of SEED_CHUNK_ROWS; returns how many were sent"""
+        insert = _INSERTS.get(self.db.bind.dialect.name)
+        key = [column.name for column in table.primary_key.columns]
+        count = 0
+        for chunk in _chunks(rows, SEED_CHUNK_ROWS):
+            count += len(chunk)
+            if insert is None:
+                # No ON CONFLICT support: one merge per row
+                for row in chunk:
+                    self.db.merge(_model_for(table)(**row))
+                continue
+            stmt = insert(table).values(chunk)
+            columns = [name for name in chunk[0] if name not in key]
+            if update and columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=key, set_={name: stmt.excluded[name] for name in columns}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing()
+            self.db.execute(stmt)
+        return count
+
+    def load_fixture(self, path: str) -> int:
+        table_name = os.path.splitext(os.path.basename(path))[0]
+        table = Base.metadata.tables.get(table_name)
+        if table is None:
+            raise ValueError(f"Fixture {path} doesn't match a table")
+        with open(path) as f:
+            rows = json.load(f)
+        return self.upsert_rows(table, rows)
+
+    def load_fixtures(self, directory: str = FIXTURES_DIR) -> Dict[str, int]:
+        loaded = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                loaded[name] = self.load_fixture(os.path.join(directory, name))
+        return loaded
+
+    def ensure_admin(self, password_hash: str) -> bool:
+        """Create the default admin account unless the username or email is taken; True if created"""
+        exists = self.db.query(User.id).filter(
+            (User.username == "admin") | (User.email == "admin@example.com")
+        ).first()
+        if exists:
+            return False
+        self.db.add(User(
+            username="admin",
+            email="admin@example.com",
+            password_hash=password_hash,
+            first_name="admin",
+            last_name="test"
+        ))
+        self.db.flush()
+        return True
+
+def _chunks(rows: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _model_for(table: Table) -> type:
+    for mapper in Base.registry.mappers:
+        if mapper.local_table is table:
+            return mapper.class_
+    raise ValueError(f"No model for table {table.name}")
@@ -0,0 +1,22 @@
+from typing import Any
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+    import json
+
+def _default(value: Any):
+    # Pydantic models and anything else the fast encoders don't know natively
+    return jsonable_encoder(value)
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes with orjson when installed, the stdlib otherwise.
+
+    Both handle datetimes and UUIDs in rows directly, so plain dicts built
+    from query results need no conversion pass first.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
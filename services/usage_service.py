@@ -0,0 +1,154 @@
+import os
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.campaign_post import CampaignPost
+from models.usage_rollup import UsageRollup
+
+# Pricing (USD) - gpt-4o-mini per 1K tokens, dall-e-3 standard 1024x1024 per image
+CAPTION_INPUT_COST_PER_1K = float(os.getenv("CAPTION_INPUT_COST_PER_1K", "0.00015"))
+CAPTION_OUTPUT_COST_PER_1K = float(os.getenv("CAPTION_OUTPUT_COST_PER_1K", "0.0006"))
+IMAGE_COST = float(os.getenv("IMAGE_COST", "0.04"))
+
+# Monthly per-user budgets, 0 means unlimited
+USER_TOKEN_BUDGET = int(os.getenv("USER_TOKEN_BUDGET", "0"))
+USER_IMAGE_BUDGET = int(os.getenv("USER_IMAGE_BUDGET", "0"))
+USER_COST_BUDGET_USD = float(os.getenv("USER_COST_BUDGET_USD", "0"))
+
+# Used for admission control before the real usage is known
+ESTIMATED_PROMPT_TOKENS_PER_POST = 250
+ESTIMATED_COMPLETION_TOKENS_PER_POST = 350
+
+class QuotaExceeded(Exception):
+    pass
+
+def current_period() -> str:
+    return datetime.utcnow().strftime("%Y-%m")
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, image_count: int) -> float:
+    return (
+        prompt_tokens / 1000 * CAPTION_INPUT_COST_PER_1K
+        + completion_tokens / 1000 * CAPTION_OUTPUT_COST_PER_1K
+        + image_count * IMAGE_COST
+    )
+
+class UsageService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, username: Optional[str], post: CampaignPost, usage: Dict, image_count: int = 0):
+        """Store usage on the post and add it to the rollup.
+
+        Does not commit - the caller commits together with the post update.
+        """
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        cost = estimate_cost(prompt_tokens, completion_tokens, image_count)
+
+        post.prompt_tokens = (post.prompt_tokens or 0) + prompt_tokens
+        post.completion_tokens = (post.completion_tokens or 0) + completion_tokens
+        post.image_count = (post.image_count or 0) + image_count
+        post.cost_usd = (post.cost_usd or 0.0) + cost
+
+        self._increment_rollup(
+            username or "anonymous", post.campaign_id,
+            prompt_tokens, completion_tokens, image_count, cost
+        )
+
+    def _increment_rollup(self, username: str, campaign_id: str, prompt_tokens: int,
+                          completion_tokens: int, image_count: int, cost: float):
+        key = {'username': username, 'campaign_id': campaign_id, 'period': current_period()}
+
+        if self.db.bind.dialect.name == "postgresql":
+            # Single atomic upsert, safe across workers
+            stmt = pg_insert(UsageRollup).values(
+                **key,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                image_count=image_count,
+                cost_usd=cost,
+                updated_at=datetime.utcnow()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['username', 'campaign_id', 'period'],
+                set_={
+                    'prompt_tokens': UsageRollup.prompt_tokens + stmt.excluded.prompt_tokens,
+                    'completion_tokens': UsageRollup.completion_tokens + stmt.excluded.completion_tokens,
+                    'image_count': UsageRollup.image_count + stmt.excluded.image_count,
+                    'cost_usd': UsageRollup.cost_usd + stmt.excluded.cost_usd,
+                    'updated_at': stmt.excluded.updated_at,
+                }
+            )
+            self.db.execute(stmt)
+            return
+
+        updated = self.db.query(UsageRollup).filter_by(**key).update({
+            UsageRollup.prompt_tokens: UsageRollup.prompt_tokens + prompt_tokens,
+            UsageRollup.completion_tokens: UsageRollup.completion_tokens + completion_tokens,
+            UsageRollup.image_count: UsageRollup.image_count + image_count,
+            UsageRollup.cost_usd: UsageRollup.cost_usd + cost,
+        }, synchronize_session=False)
+        if not updated:
+            self.db.add(UsageRollup(
+                **key,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                image_count=image_count,
+                cost_usd=cost
+            ))
+            # Later increments in this transaction must find the row
+            self.db.flush()
+
+    def get_user_usage(self, username: str, period: Optional[str] = None) -> Dict:
+        """Totals for a user in a billing period, summed over their campaign rollups"""
+        row = self.db.query(
+            func.coalesce(func.sum(UsageRollup.prompt_tokens), 0),
+            func.coalesce(func.sum(UsageRollup.completion_tokens), 0),
+            func.coalesce(func.sum(UsageRollup.image_count), 0),
+            func.coalesce(func.sum(UsageRollup.cost_usd), 0.0),
+        ).filter(
+            UsageRollup.username == username,
+            UsageRollup.period == (period or current_period())
+        ).one()
+
+        return {
+            'prompt_tokens': int(row[0]),
+            'completion_tokens': int(row[1]),
+            'total_tokens': int(row[0]) + int(row[1]),
+            'image_count': int(row[2]),
+            'cost_usd': round(float(row[3]), 6),
+        }
+
+    def get_campaign_usage(self, username: str, period: Optional[str] = None):
+        return self.db.query(UsageRollup).filter(
+            UsageRollup.username == username,
+            UsageRollup.period == (period or current_period())
+        ).all()
+
+    def check_budget(self, username: str, post_count: int):
+        """Admission control - raise QuotaExceeded if the batch would blow the monthly budget"""
+        if not (USER_TOKEN_BUDGET or USER_IMAGE_BUDGET or USER_COST_BUDGET_USD):
+            return
+
+        used = self.get_user_usage(username)
+        est_prompt = post_count * ESTIMATED_PROMPT_TOKENS_PER_POST
+        est_completion = post_count * ESTIMATED_COMPLETION_TOKENS_PER_POST
+        est_cost = estimate_cost(est_prompt, est_completion, post_count)
+
+        if USER_TOKEN_BUDGET and used['total_tokens'] + est_prompt + est_completion > USER_TOKEN_BUDGET:
+            raise QuotaExceeded(
+                f"Token budget exceeded: {used['total_tokens']} used, "
+                f"~{est_prompt + est_completion} needed, budget {USER_TOKEN_BUDGET}"
+            )
+        if USER_IMAGE_BUDGET and used['image_count'] + post_count > USER_IMAGE_BUDGET:
+            raise QuotaExceeded(
+                f"Image budget exceeded: {used['image_count']} used, "
+                f"{post_count} needed, budget {USER_IMAGE_BUDGET}"
+            )
+        if USER_COST_BUDGET_USD and used['cost_usd'] + est_cost > USER_COST_BUDGET_USD:
+            raise QuotaExceeded(
+                f"Cost budget exceeded: ${used['cost_usd']:.2f} used, "
+                f"~${est_cost:.2f} needed, budget ${USER_COST_BUDGET_USD:.2f}"
+            )